@@ -3,10 +3,481 @@ Base Encoder - Abstract base class for all visual encoders.
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Tuple, Optional
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, List, Sequence, Tuple, Optional, Union
+import contextlib
+import logging
+import threading
+import time
 import torch
+import torch.nn as nn
 import torch.nn.functional as F
 
+logger = logging.getLogger(__name__)
+
+# Frame-comparison analysis ladder: a similarity strictly above
+# SIMILARITY_THRESHOLDS[i] earns SIMILARITY_ANALYSES[i + 1]
+SIMILARITY_THRESHOLDS = (0.70, 0.85, 0.95)
+SIMILARITY_ANALYSES = (
+    "Frames are significantly different",
+    "Frames have noticeable differences",
+    "Frames are semantically similar with minor differences",
+    "Frames are nearly identical",
+)
+
+
+def describe_similarity(similarity: float) -> str:
+    """Map a frame similarity score to its analysis string"""
+    return SIMILARITY_ANALYSES[bisect_left(SIMILARITY_THRESHOLDS, similarity)]
+
+
+def describe_similarities(similarities: Sequence[float]) -> List[str]:
+    """Map a batch of frame similarity scores to analysis strings"""
+    return [SIMILARITY_ANALYSES[bisect_left(SIMILARITY_THRESHOLDS, s)] for s in similarities]
+
+
+def get_autocast_dtype(device: torch.device) -> Optional[torch.dtype]:
+    """
+    Pick the mixed-precision dtype for a device.
+
+    BF16 keeps the FP32 exponent range (no overflow in attention softmax) and
+    runs on the same tensor cores as FP16, so it is preferred on Ampere+.
+    Older GPUs fall back to FP16; CPU runs in FP32.
+    """
+    if device.type != "cuda":
+        return None
+    if torch.cuda.get_device_capability(device)[0] >= 8:
+        return torch.bfloat16
+    return torch.float16
+
+
+def prefers_channels_last(device: torch.device) -> bool:
+    """
+    Whether to run conv inputs in channels_last (NHWC) on this device.
+
+    Ampere+ cuDNN picks faster NHWC kernels for the ViT patch-embedding
+    conv; elsewhere the layout change only costs a copy.
+    """
+    return device.type == "cuda" and torch.cuda.get_device_capability(device)[0] >= 8
+
+
+def place_model(
+    model: nn.Module,
+    device: torch.device,
+    dtype: Optional[torch.dtype] = None,
+    channels_last: bool = False,
+    memory_format: torch.memory_format = torch.channels_last
+) -> nn.Module:
+    """
+    Move an eval-mode model to its serving dtype, device and layout, in place.
+
+    The cast happens on the host before the upload, so FP32 weights never
+    land on the GPU (both are no-ops for weights loaded in place). With
+    channels_last, conv weights switch to memory_format (see
+    prefers_channels_last); callers convert their inputs to match.
+    """
+    if dtype is not None:
+        model.to(dtype)
+    model.to(device)
+    if channels_last:
+        model.to(memory_format=memory_format)
+    return model
+
+
+def autocast_context(device: torch.device, dtype: Optional[torch.dtype]):
+    """Autocast context for encoder forwards (no-op when dtype is None)"""
+    if dtype is None:
+        return contextlib.nullcontext()
+    return torch.autocast(device_type=device.type, dtype=dtype)
+
+
+def normalized_similarity(a: torch.Tensor, b: torch.Tensor) -> torch.Tensor:
+    """
+    Cosine similarity of embeddings that are already L2-normalized.
+
+    A plain dot product over the last dim; skips the norm recomputation
+    and division F.cosine_similarity would do. Broadcasts like it too.
+    """
+    return (a * b).sum(dim=-1)
+
+
+# utils.TRANSFORM normalization
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+
+def register_pixel_stats(module: nn.Module, device: torch.device):
+    """
+    Register utils.TRANSFORM's mean and std as (1, 3, 1, 1) non-persistent
+    buffers _pixel_mean and _pixel_std, for preprocess_uint8.
+    """
+    module.register_buffer(
+        "_pixel_mean", torch.tensor(IMAGENET_MEAN, device=device).view(1, 3, 1, 1), persistent=False
+    )
+    module.register_buffer(
+        "_pixel_std", torch.tensor(IMAGENET_STD, device=device).view(1, 3, 1, 1), persistent=False
+    )
+
+
+def preprocess_uint8(
+    batch: torch.Tensor,
+    mean: torch.Tensor,
+    std: torch.Tensor,
+    size: int = 384
+) -> torch.Tensor:
+    """
+    On-device equivalent of utils.TRANSFORM for raw frames.
+
+    Args:
+        batch: uint8 tensor (N, 3, H, W), already on the target device
+        mean, std: (1, 3, 1, 1) tensors on the same device
+
+    Returns:
+        Normalized float tensor (N, 3, size, size)
+    """
+    batch = batch.float().div_(255)
+    if batch.shape[-2:] != (size, size):
+        batch = F.interpolate(batch, size=(size, size), mode="bilinear", align_corners=False, antialias=True)
+    return batch.sub_(mean).div_(std)
+
+
+class PinnedBufferPool:
+    """
+    Reusable pinned host buffers for single-tensor uploads, keyed by shape
+    and dtype.
+
+    A buffer goes back to the pool with an event marking the end of the
+    upload that reads it, and is only handed out again once that event has
+    completed, so steady-state uploads neither allocate nor page-lock memory.
+    """
+
+    def __init__(self, max_per_key: int = 8):
+        self.max_per_key = max_per_key
+        self._free: Dict[Tuple, Deque[Tuple[torch.Tensor, torch.cuda.Event]]] = {}
+        self._lock = threading.Lock()
+
+    def upload(self, tensor: torch.Tensor, device: torch.device) -> torch.Tensor:
+        """Copy a CPU tensor to device through a pooled pinned buffer"""
+        key = (tuple(tensor.shape), tensor.dtype)
+        host = None
+        with self._lock:
+            free = self._free.setdefault(key, deque())
+            if free and free[0][1].query():
+                host, _ = free.popleft()
+        if host is None:
+            host = torch.empty(tensor.shape, dtype=tensor.dtype, pin_memory=True)
+
+        host.copy_(tensor)
+        out = host.to(device, non_blocking=True)
+        done = torch.cuda.Event()
+        done.record(torch.cuda.current_stream(device))
+
+        with self._lock:
+            free = self._free[key]
+            if len(free) < self.max_per_key:
+                free.append((host, done))
+        return out
+
+
+_pinned_pool = PinnedBufferPool()
+
+
+def to_device(tensor: torch.Tensor, device: torch.device) -> torch.Tensor:
+    """
+    Move a tensor to device.
+
+    CPU tensors headed for CUDA are staged through pooled pinned buffers so
+    the host->device copy is asynchronous and doesn't stall the GPU.
+    """
+    if device.type == "cuda" and tensor.device.type == "cpu":
+        return _pinned_pool.upload(tensor, device)
+    return tensor.to(device)
+
+
+@torch.inference_mode()
+def warmup_encoder(encoder, batch_sizes: Sequence[int] = (1, 8), size: int = 384):
+    """
+    Run dummy forwards so compilation and CUDA graph capture happen before
+    the first request rather than inside it.
+    """
+    # reduce-overhead records its graph on the second call of a shape
+    for _ in range(2):
+        encoder.encode_single(torch.zeros(3, size, size))
+    for batch_size in batch_sizes:
+        if batch_size > 1:
+            encoder.encode_batch(torch.zeros(batch_size, 3, size, size))
+
+
+class InputBuffer:
+    """
+    Reusable pinned-host and device buffers for batched encoder inputs.
+
+    Frames are stacked straight into a pinned host buffer and copied into a
+    persistent device buffer, so steady-state batches allocate nothing.
+    Buffers grow to the largest batch seen. One instance is shared by all
+    callers of an encoder, so the batch yielded by stage() is only valid
+    inside the with-block (the lock is held until it exits).
+    """
+
+    def __init__(self, device: torch.device):
+        self.device = device
+        self._host: Optional[torch.Tensor] = None
+        self._staged: Optional[torch.Tensor] = None
+        self._upload_done: Optional[torch.cuda.Event] = None
+        self._lock = threading.Lock()
+
+    def _ensure_capacity(self, frames: Union[List[torch.Tensor], torch.Tensor]):
+        n = len(frames)
+        frame = frames[0]
+        if (
+            self._staged is None
+            or self._staged.shape[0] < n
+            or self._staged.shape[1:] != frame.shape
+            or self._staged.dtype != frame.dtype
+        ):
+            shape = (n, *frame.shape)
+            self._host = torch.empty(shape, dtype=frame.dtype, pin_memory=True)
+            self._staged = torch.empty(shape, dtype=frame.dtype, device=self.device)
+            self._upload_done = None
+
+    @contextlib.contextmanager
+    def stage(self, frames: Union[List[torch.Tensor], torch.Tensor]):
+        """
+        Upload CPU frames into the device buffer and yield the batch view.
+
+        frames is a list of (C, H, W) tensors or an already stacked
+        (N, C, H, W) tensor.
+        """
+        with self._lock:
+            self._ensure_capacity(frames)
+
+            # The previous upload must finish reading the host buffer
+            # before it is overwritten
+            if self._upload_done is not None:
+                self._upload_done.synchronize()
+
+            n = len(frames)
+            host = self._host[:n]
+            if isinstance(frames, torch.Tensor):
+                host.copy_(frames)
+            else:
+                torch.stack(frames, out=host)
+            batch = self._staged[:n]
+            batch.copy_(host, non_blocking=True)
+
+            self._upload_done = torch.cuda.Event()
+            self._upload_done.record()
+
+            yield batch
+
+
+class MicroBatcher:
+    """
+    Coalesces encodes from concurrent callers into batched forwards.
+
+    Callers block in encode() until their frames are embedded. A worker
+    thread takes the pending requests, waits up to max_wait_ms for more
+    while the batch is below max_batch frames, runs one encode_batch call
+    and hands each caller its rows. Frames of one batch must share shape
+    and dtype; a request that doesn't match waits for the next batch.
+    """
+
+    def __init__(
+        self,
+        encode_batch: Callable[[List[torch.Tensor]], torch.Tensor],
+        max_batch: int = 16,
+        max_wait_ms: float = 4.0,
+        name: str = "encoder"
+    ):
+        self._encode_batch = encode_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._pending: Deque[Tuple[List[torch.Tensor], Future]] = deque()
+        self._cond = threading.Condition()
+        self._worker = threading.Thread(target=self._run, name=f"{name}-batcher", daemon=True)
+        self._worker.start()
+
+    def encode(self, frames: List[torch.Tensor]) -> torch.Tensor:
+        """Embeddings (len(frames), embed_dim) for a list of (3, H, W) frames"""
+        if not frames:
+            raise ValueError("No frames to encode")
+        future: Future = Future()
+        with self._cond:
+            self._pending.append((list(frames), future))
+            self._cond.notify()
+        return future.result()
+
+    def _pending_frames(self) -> int:
+        return sum(len(frames) for frames, _ in self._pending)
+
+    def _next_batch(self) -> List[Tuple[List[torch.Tensor], Future]]:
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+
+            deadline = time.monotonic() + self.max_wait
+            while self._pending_frames() < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            first = self._pending[0][0][0]
+            batch, count = [], 0
+            while self._pending and (not batch or count + len(self._pending[0][0]) <= self.max_batch):
+                frame = self._pending[0][0][0]
+                if frame.shape != first.shape or frame.dtype != first.dtype:
+                    break
+                frames, future = self._pending.popleft()
+                batch.append((frames, future))
+                count += len(frames)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            frames = [f for request_frames, _ in batch for f in request_frames]
+            try:
+                with torch.inference_mode():
+                    embeddings = self._encode_batch(frames).reshape(len(frames), -1)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            start = 0
+            for request_frames, future in batch:
+                future.set_result(embeddings[start:start + len(request_frames)])
+                start += len(request_frames)
+
+
+class CUDAGraphRunner:
+    """
+    Capture a fixed-shape forward into a CUDA graph and replay it.
+
+    A replay launches the whole captured forward at once instead of
+    dispatching every kernel from Python. Replays share static input and
+    output tensors, so calls are serialized and the output is cloned before
+    the lock is released. Must be constructed under no_grad/inference mode.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[torch.Tensor], torch.Tensor],
+        example: torch.Tensor,
+        warmup_iters: int = 3
+    ):
+        self.static_input = example.clone()
+        self._lock = threading.Lock()
+
+        # Warm up on a side stream so lazy init / autotuning isn't captured
+        side_stream = torch.cuda.Stream(example.device)
+        side_stream.wait_stream(torch.cuda.current_stream(example.device))
+        with torch.cuda.stream(side_stream):
+            for _ in range(warmup_iters):
+                fn(self.static_input)
+        torch.cuda.current_stream(example.device).wait_stream(side_stream)
+
+        # thread_local: other request threads may keep launching work
+        # while a lazily captured graph is being recorded
+        self.graph = torch.cuda.CUDAGraph()
+        with torch.cuda.graph(self.graph, capture_error_mode="thread_local"):
+            self.static_output = fn(self.static_input)
+
+    def matches(self, x: torch.Tensor) -> bool:
+        """Whether x can be replayed through the captured graph"""
+        return x.shape == self.static_input.shape and x.dtype == self.static_input.dtype
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        with self._lock:
+            self.static_input.copy_(x, non_blocking=True)
+            self.graph.replay()
+            return self.static_output.clone()
+
+
+def quantize_int8_weights(module: nn.Module) -> bool:
+    """
+    Apply INT8 weight-only quantization to the Linear layers of a module.
+
+    Only nn.Linear weights are quantized; LayerNorm and softmax stay in
+    floating point. Weight-only quantization needs no activation
+    calibration. Returns False if torchao is not installed.
+    """
+    try:
+        from torchao.quantization import quantize_, int8_weight_only
+    except ImportError:
+        logger.warning("torchao not installed, skipping INT8 quantization")
+        return False
+
+    quantize_(module, int8_weight_only())
+    return True
+
+
+class TensorRTRunner:
+    """
+    Runs a serialized TensorRT engine with one input and one output on
+    device tensors.
+
+    Engines are expected to have a dynamic batch dimension (see
+    DINOv2Encoder.export_onnx). The execution context is not thread-safe,
+    so calls are serialized.
+    """
+
+    def __init__(self, engine_path: str, device: torch.device):
+        import numpy as np
+        import tensorrt as trt
+
+        self.device = device
+        self._logger = trt.Logger(trt.Logger.WARNING)
+        with open(engine_path, "rb") as f:
+            self._engine = trt.Runtime(self._logger).deserialize_cuda_engine(f.read())
+        if self._engine is None:
+            raise RuntimeError(f"Could not deserialize TensorRT engine {engine_path}")
+        self._context = self._engine.create_execution_context()
+
+        names = [self._engine.get_tensor_name(i) for i in range(self._engine.num_io_tensors)]
+        inputs = [n for n in names if self._engine.get_tensor_mode(n) == trt.TensorIOMode.INPUT]
+        outputs = [n for n in names if self._engine.get_tensor_mode(n) == trt.TensorIOMode.OUTPUT]
+        if len(inputs) != 1 or len(outputs) != 1:
+            raise ValueError(f"Expected one input and one output, got {inputs} -> {outputs}")
+        self._input, self._output = inputs[0], outputs[0]
+
+        def torch_dtype(name):
+            return torch.from_numpy(np.empty(0, dtype=trt.nptype(self._engine.get_tensor_dtype(name)))).dtype
+
+        self._input_dtype = torch_dtype(self._input)
+        self._output_dtype = torch_dtype(self._output)
+        self._lock = threading.Lock()
+
+    def __call__(self, inputs: torch.Tensor) -> torch.Tensor:
+        inputs = inputs.to(self._input_dtype).contiguous()
+        with self._lock:
+            self._context.set_input_shape(self._input, tuple(inputs.shape))
+            output = torch.empty(
+                tuple(self._context.get_tensor_shape(self._output)), dtype=self._output_dtype, device=self.device
+            )
+            self._context.set_tensor_address(self._input, inputs.data_ptr())
+            self._context.set_tensor_address(self._output, output.data_ptr())
+            if not self._context.execute_async_v3(torch.cuda.current_stream(self.device).cuda_stream):
+                raise RuntimeError("TensorRT execution failed")
+        return output
+
+
+def load_tensorrt_engine(engine_path: str, device: torch.device) -> Optional[TensorRTRunner]:
+    """Load a TensorRT engine. Returns None (PyTorch fallback) if it can't be used."""
+    if device.type != "cuda":
+        logger.warning("TensorRT needs a CUDA device, using the PyTorch backend")
+        return None
+    try:
+        return TensorRTRunner(engine_path, device)
+    except ImportError:
+        logger.warning("tensorrt not installed, using the PyTorch backend")
+    except Exception as e:
+        logger.warning(f"Failed to load TensorRT engine {engine_path}, using the PyTorch backend: {e}")
+    return None
+
 
 class BaseEncoder(ABC):
     """Abstract base class for visual encoders"""
@@ -29,6 +500,10 @@ class BaseEncoder(ABC):
         embeddings = [self.encode_single(f) for f in frames]
         return torch.stack(embeddings)
 
+    def encode_batch(self, frames: Union[List[torch.Tensor], torch.Tensor]) -> torch.Tensor:
+        """Encode independent frames - default is encode_frames"""
+        return self.encode_frames(frames)
+
     def compare(
         self,
         frame1: torch.Tensor,
@@ -46,16 +521,7 @@ class BaseEncoder(ABC):
         similarity = F.cosine_similarity(emb1, emb2, dim=-1).item()
         is_similar = similarity >= 0.85
 
-        if similarity > 0.95:
-            analysis = "Frames are nearly identical"
-        elif similarity > 0.85:
-            analysis = "Frames are semantically similar with minor differences"
-        elif similarity > 0.70:
-            analysis = "Frames have noticeable differences"
-        else:
-            analysis = "Frames are significantly different"
-
-        return similarity, is_similar, analysis
+        return similarity, is_similar, describe_similarity(similarity)
 
     def batch_compare(
         self,
@@ -63,11 +529,16 @@ class BaseEncoder(ABC):
         threshold: float = 0.85
     ) -> List[Tuple[float, bool]]:
         """Compare multiple frame pairs"""
-        results = []
-        for f1, f2 in pairs:
-            sim, is_sim, _ = self.compare(f1, f2)
-            results.append((sim, is_sim))
-        return results
+        if not pairs:
+            return []
+
+        emb1 = self.encode_frames([f1 for f1, _ in pairs]).reshape(len(pairs), -1)
+        emb2 = self.encode_frames([f2 for _, f2 in pairs]).reshape(len(pairs), -1)
+
+        # Single device->host sync for the whole batch
+        similarities = F.cosine_similarity(emb1, emb2, dim=-1).tolist()
+
+        return [(sim, sim >= threshold) for sim in similarities]
 
     def get_memory_usage(self) -> int:
         """Get GPU memory usage in MB"""
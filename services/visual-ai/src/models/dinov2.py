@@ -14,12 +14,45 @@ DINOv2 excels at:
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Union
 import logging
 
+from .base import (
+    get_autocast_dtype, autocast_context, prefers_channels_last, quantize_int8_weights, to_device,
+    describe_similarity, normalized_similarity, warmup_encoder, preprocess_uint8, InputBuffer, CUDAGraphRunner,
+    load_tensorrt_engine, place_model, register_pixel_stats
+)
+
 logger = logging.getLogger(__name__)
 
 
+def _grid_change_scores(
+    features1: torch.Tensor,
+    features2: torch.Tensor,
+    grid_size: int
+) -> torch.Tensor:
+    """
+    Pool (1, C, h, w) feature maps to a grid and score each cell.
+
+    Returns a (grid_size, grid_size) tensor of 1 - cosine similarity.
+    Pooling, the dot product and both norms are expressed as plain
+    reductions so Inductor can emit them as a single fused kernel.
+    """
+    h, w = features1.shape[-2:]
+
+    # Trailing rows/cols that don't fill a whole cell are dropped
+    pool_h = h // grid_size
+    pool_w = w // grid_size
+    features1 = features1[:, :, :grid_size * pool_h, :grid_size * pool_w]
+    features2 = features2[:, :, :grid_size * pool_h, :grid_size * pool_w]
+    pooled1 = F.avg_pool2d(features1, kernel_size=(pool_h, pool_w))[0]
+    pooled2 = F.avg_pool2d(features2, kernel_size=(pool_h, pool_w))[0]
+
+    dot = (pooled1 * pooled2).sum(dim=0)
+    norms = pooled1.norm(dim=0) * pooled2.norm(dim=0)
+    return 1.0 - dot / norms.clamp_min(1e-8)
+
+
 class DINOv2Encoder(nn.Module):
     """
     DINOv2 encoder for fast visual embeddings.
@@ -30,8 +63,18 @@ class DINOv2Encoder(nn.Module):
 
     MODEL_ID = "facebook/dinov2-giant"
     LICENSE = "Apache-2.0"
+    INPUT_SIZE = 384  # matches utils.TRANSFORM
 
-    def __init__(self, device: str = "cuda", model_size: str = "giant"):
+    def __init__(
+        self,
+        device: str = "cuda",
+        model_size: str = "giant",
+        quantize: bool = False,
+        compile_model: bool = False,
+        weights_path: Optional[str] = None,
+        cuda_graphs: bool = False,
+        trt_engine: Optional[str] = None
+    ):
         super().__init__()
         self.device = torch.device(device if torch.cuda.is_available() else "cpu")
 
@@ -41,20 +84,111 @@ class DINOv2Encoder(nn.Module):
         # Load DINOv2 model
         model_name = f"dinov2_vit{model_size[0]}14"  # dinov2_vitg14
         try:
-            self.model = torch.hub.load('facebookresearch/dinov2', model_name)
+            self.model = self._load_backbone(model_name, weights_path)
         except Exception as e:
             logger.warning(f"Failed to load {model_name}, trying base: {e}")
             self.model = torch.hub.load('facebookresearch/dinov2', 'dinov2_vitb14')
 
-        self.model.to(self.device)
         self.model.eval()
 
-        # Use FP16 for efficiency on GPU
-        if self.device.type == "cuda":
-            self.model = self.model.half()
+        # Reduced-precision weights on GPU; forwards run under autocast so
+        # LayerNorm/softmax still compute in FP32. Inputs are converted to
+        # channels_last in _forward.
+        self.amp_dtype = get_autocast_dtype(self.device)
+        self.channels_last = prefers_channels_last(self.device)
+        place_model(self.model, self.device, self.amp_dtype, self.channels_last)
+        register_pixel_stats(self, self.device)
+
+        # Optional INT8 weight-only quantization of the ViT linear layers
+        self.quantized = quantize and quantize_int8_weights(self.model)
 
         self.embed_dim = self.model.embed_dim
-        logger.info(f"DINOv2 loaded: embed_dim={self.embed_dim}, device={self.device}")
+
+        # Fuse the ViT block ops with Inductor. Inputs are always 3x384x384
+        # (see utils.TRANSFORM) so only the batch dimension varies.
+        self.compiled = compile_model
+        if compile_model:
+            self.model = torch.compile(self.model, mode="reduce-overhead", dynamic=False)
+            self._grid_change_scores = torch.compile(_grid_change_scores, dynamic=False)
+        else:
+            self._grid_change_scores = _grid_change_scores
+
+        # Side stream for uploading the next batch in encode_frames_streamed
+        self._copy_stream = torch.cuda.Stream(self.device) if self.device.type == "cuda" else None
+
+        # Reused staging buffers for encode_frames
+        self._input_buffer = InputBuffer(self.device) if self.device.type == "cuda" else None
+
+        # Optional TensorRT engine for the CLS-embedding forward (see
+        # export_onnx); falls back to PyTorch if it can't be loaded.
+        # get_intermediate_layers (detect_changes) always runs in PyTorch.
+        self._trt_runner = load_tensorrt_engine(trt_engine, self.device) if trt_engine else None
+
+        # Replay single-frame encodes from a captured CUDA graph. Skipped
+        # when compiled: reduce-overhead mode already uses CUDA graphs.
+        self._graph_runner = None
+        if cuda_graphs and self.device.type == "cuda" and not self.compiled and self._trt_runner is None:
+            example = torch.zeros(1, 3, self.INPUT_SIZE, self.INPUT_SIZE, device=self.device)
+            with torch.no_grad():
+                self._graph_runner = CUDAGraphRunner(self._forward, example)
+
+        logger.info(f"DINOv2 loaded: embed_dim={self.embed_dim}, device={self.device}, quantized={self.quantized}, compiled={self.compiled}, cuda_graphs={self._graph_runner is not None}, backend={self.backend}")
+
+    @property
+    def backend(self) -> str:
+        return "tensorrt" if self._trt_runner is not None else "torch"
+
+    @staticmethod
+    def _load_backbone(model_name: str, weights_path: Optional[str]) -> nn.Module:
+        """
+        Build a DINOv2 backbone from torch.hub.
+
+        With weights_path, the architecture is built without downloading
+        pretrained weights and the local checkpoint (.safetensors or a
+        torch state dict) is memory-mapped instead of read into RAM.
+        """
+        if not weights_path:
+            return torch.hub.load('facebookresearch/dinov2', model_name)
+
+        model = torch.hub.load('facebookresearch/dinov2', model_name, pretrained=False)
+        if weights_path.endswith(".safetensors"):
+            from safetensors.torch import load_file
+            state_dict = load_file(weights_path)
+        else:
+            state_dict = torch.load(weights_path, map_location="cpu", mmap=True, weights_only=True)
+        model.load_state_dict(state_dict)
+        logger.info(f"Loaded DINOv2 weights from {weights_path}")
+        return model
+
+    @classmethod
+    def export_onnx(
+        cls,
+        path: str,
+        model_size: str = "giant",
+        weights_path: Optional[str] = None,
+        opset: int = 17
+    ):
+        """
+        Export the FP32 CLS-embedding backbone to ONNX with a dynamic batch
+        dimension, for building a TensorRT engine, e.g.:
+
+            trtexec --onnx=dinov2.onnx --fp16 --saveEngine=dinov2.trt
+                --minShapes=pixels:1x3x384x384 --optShapes=pixels:8x3x384x384
+                --maxShapes=pixels:32x3x384x384
+        """
+        model = cls._load_backbone(f"dinov2_vit{model_size[0]}14", weights_path).eval()
+        example = torch.zeros(1, 3, cls.INPUT_SIZE, cls.INPUT_SIZE)
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                example,
+                path,
+                input_names=["pixels"],
+                output_names=["embedding"],
+                dynamic_axes={"pixels": {0: "batch"}, "embedding": {0: "batch"}},
+                opset_version=opset,
+            )
+        logger.info(f"Exported DINOv2-{model_size} to {path}")
 
     @torch.no_grad()
     def encode_single(self, frame: torch.Tensor) -> torch.Tensor:
@@ -70,26 +204,96 @@ class DINOv2Encoder(nn.Module):
         if frame.dim() == 3:
             frame = frame.unsqueeze(0)
 
-        frame = frame.to(self.device)
-        if self.device.type == "cuda":
-            frame = frame.half()
+        # Raw frames are normalized on device first so they can replay the
+        # captured float graph
+        if frame.dtype == torch.uint8:
+            frame = self._preprocess(to_device(frame, self.device))
 
         # Get CLS token embedding
-        embedding = self.model(frame)
-
-        # Normalize
-        return F.normalize(embedding, p=2, dim=-1)
+        if self._graph_runner is not None and self._graph_runner.matches(frame):
+            embedding = self._graph_runner(frame)
+        else:
+            embedding = self._forward(to_device(frame, self.device))
+
+        # Normalize in FP32
+        return F.normalize(embedding.float(), p=2, dim=-1)
+
+    def _preprocess(self, batch: torch.Tensor) -> torch.Tensor:
+        """Resize/normalize raw uint8 device frames; preprocessed frames pass through"""
+        if batch.dtype == torch.uint8:
+            return preprocess_uint8(batch, self._pixel_mean, self._pixel_std, self.INPUT_SIZE)
+        return batch
+
+    def _forward(self, batch: torch.Tensor) -> torch.Tensor:
+        """Run the backbone on a device batch under autocast"""
+        batch = self._preprocess(batch)
+        if self._trt_runner is not None:
+            return self._trt_runner(batch)
+        if self.channels_last:
+            batch = batch.contiguous(memory_format=torch.channels_last)
+        with autocast_context(self.device, self.amp_dtype):
+            return self.model(batch)
 
     @torch.no_grad()
-    def encode_frames(self, frames: List[torch.Tensor]) -> torch.Tensor:
+    def encode_frames(self, frames: Union[List[torch.Tensor], torch.Tensor]) -> torch.Tensor:
         """Encode multiple frames efficiently"""
-        # Stack and batch process
-        batch = torch.stack(frames).to(self.device)
-        if self.device.type == "cuda":
-            batch = batch.half()
+        if self._input_buffer is not None and frames[0].device.type == "cpu":
+            # Stack into the reused pinned/device buffers
+            with self._input_buffer.stage(frames) as batch:
+                embeddings = self._forward(batch)
+        else:
+            batch = frames if isinstance(frames, torch.Tensor) else torch.stack(frames)
+            embeddings = self._forward(batch.to(self.device))
+
+        return F.normalize(embeddings.float(), p=2, dim=-1)
+
+    @torch.no_grad()
+    def encode_batch(self, frames: Union[List[torch.Tensor], torch.Tensor]) -> torch.Tensor:
+        """
+        Encode independent frames in one forward.
+
+        Args:
+            frames: List of (3, H, W) tensors or a stacked (N, 3, H, W) tensor
+
+        Returns:
+            Normalized embeddings of shape (N, embed_dim)
+        """
+        return self.encode_frames(frames)
+
+    @torch.no_grad()
+    def encode_frames_streamed(self, batches: List[List[torch.Tensor]]) -> List[torch.Tensor]:
+        """
+        Encode several batches of frames, uploading batch i+1 on a side
+        stream while batch i runs on the compute stream.
+
+        Returns:
+            One (len(batch), embed_dim) normalized tensor per input batch
+        """
+        if self._copy_stream is None:
+            return [self.encode_frames(frames) for frames in batches]
+
+        compute_stream = torch.cuda.current_stream(self.device)
+
+        def upload(frames: List[torch.Tensor]) -> torch.Tensor:
+            host = torch.stack(frames).pin_memory()
+            with torch.cuda.stream(self._copy_stream):
+                return host.to(self.device, non_blocking=True)
+
+        results = []
+        pending = upload(batches[0]) if batches else None
+        for i in range(len(batches)):
+            batch = pending
+            # Wait only for copies issued so far, i.e. this batch
+            compute_stream.wait_stream(self._copy_stream)
+            batch.record_stream(compute_stream)
+
+            if i + 1 < len(batches):
+                pending = upload(batches[i + 1])
 
-        embeddings = self.model(batch)
-        return F.normalize(embeddings, p=2, dim=-1)
+            embeddings = self._forward(batch)
+            results.append(F.normalize(embeddings.float(), p=2, dim=-1))
+
+        return results
 
     @torch.no_grad()
     def compare(
@@ -107,19 +311,10 @@ class DINOv2Encoder(nn.Module):
         emb1 = self.encode_single(frame1)
         emb2 = self.encode_single(frame2)
 
-        similarity = F.cosine_similarity(emb1, emb2, dim=-1).item()
+        similarity = normalized_similarity(emb1, emb2).item()
         is_similar = similarity >= threshold
 
-        if similarity > 0.95:
-            analysis = "Frames are nearly identical"
-        elif similarity > 0.85:
-            analysis = "Frames are semantically similar with minor differences"
-        elif similarity > 0.70:
-            analysis = "Frames have noticeable differences"
-        else:
-            analysis = "Frames are significantly different"
-
-        return similarity, is_similar, analysis
+        return similarity, is_similar, describe_similarity(similarity)
 
     @torch.no_grad()
     def batch_compare(
@@ -134,10 +329,11 @@ class DINOv2Encoder(nn.Module):
         Returns:
             List of (pair_id, similarity, is_similar)
         """
-        baseline_embs = self.encode_frames(baselines)
-        actual_embs = self.encode_frames(actuals)
+        # Both sides in one forward
+        embeddings = self.encode_frames(list(baselines) + list(actuals))
+        baseline_embs, actual_embs = embeddings[:len(baselines)], embeddings[len(baselines):]
 
-        similarities = F.cosine_similarity(baseline_embs, actual_embs, dim=-1)
+        similarities = normalized_similarity(baseline_embs, actual_embs)
 
         results = []
         for i, sim in enumerate(similarities.tolist()):
@@ -166,38 +362,37 @@ class DINOv2Encoder(nn.Module):
         if frame2.dim() == 3:
             frame2 = frame2.unsqueeze(0)
 
-        frame1 = frame1.to(self.device)
-        frame2 = frame2.to(self.device)
-
-        if self.device.type == "cuda":
-            frame1 = frame1.half()
-            frame2 = frame2.half()
+        # Both frames share the preprocessing shape, so one backbone pass
+        # yields both patch-token maps
+        frames = to_device(torch.cat([frame1, frame2]), self.device)
+        if self.channels_last:
+            frames = frames.contiguous(memory_format=torch.channels_last)
 
         # Get intermediate features
-        features1 = self.model.get_intermediate_layers(frame1, n=1)[0]
-        features2 = self.model.get_intermediate_layers(frame2, n=1)[0]
+        with autocast_context(self.device, self.amp_dtype):
+            features = self.model.get_intermediate_layers(frames, n=1)[0]
+        features = features.float()
 
-        # Reshape to grid
-        h = w = int((features1.shape[1]) ** 0.5)
-        features1 = features1.reshape(1, h, w, -1)
-        features2 = features2.reshape(1, h, w, -1)
+        # Reshape to grid, channels first for pooling
+        h = w = int((features.shape[1]) ** 0.5)
+        features = features.reshape(2, h, w, -1).permute(0, 3, 1, 2)
+        features1, features2 = features[:1], features[1:]
 
-        # Pool to grid_size x grid_size
-        pool_h = h // grid_size
-        pool_w = w // grid_size
+        # Pool to grid_size x grid_size and score every cell at once; a
+        # single device->host transfer for the whole grid
+        change_scores = self._grid_change_scores(features1, features2, grid_size).cpu().numpy()
 
         changes = []
         for i in range(grid_size):
             for j in range(grid_size):
-                patch1 = features1[:, i*pool_h:(i+1)*pool_h, j*pool_w:(j+1)*pool_w, :].mean(dim=(1,2))
-                patch2 = features2[:, i*pool_h:(i+1)*pool_h, j*pool_w:(j+1)*pool_w, :].mean(dim=(1,2))
-
-                sim = F.cosine_similarity(patch1, patch2, dim=-1).item()
-                change_score = 1.0 - sim
-                changes.append((i, j, change_score))
+                changes.append((i, j, float(change_scores[i, j])))
 
         return changes
 
+    def warmup(self):
+        """Prime compiled/graph-captured forwards for single and batched frames"""
+        warmup_encoder(self)
+
     def get_info(self) -> dict:
         """Get model info"""
         return {
@@ -205,4 +400,8 @@ class DINOv2Encoder(nn.Module):
             "license": self.LICENSE,
             "embed_dim": self.embed_dim,
             "device": str(self.device),
+            "quantized": self.quantized,
+            "compiled": self.compiled,
+            "channels_last": self.channels_last,
+            "backend": self.backend,
         }
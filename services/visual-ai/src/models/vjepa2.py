@@ -14,11 +14,32 @@ V-JEPA 2 excels at:
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from typing import List, Tuple, Optional
+from typing import Dict, List, Sequence, Tuple, Optional, Union
+import contextlib
 import logging
+import threading
+
+from .base import (
+    get_autocast_dtype, autocast_context, prefers_channels_last, normalized_similarity,
+    preprocess_uint8, warmup_encoder, CUDAGraphRunner, InputBuffer, place_model, register_pixel_stats
+)
 
 logger = logging.getLogger(__name__)
 
+# A frame sequence: a list of (3, H, W) tensors or one stacked (T, 3, H, W) tensor
+Frames = Union[List[torch.Tensor], torch.Tensor]
+
+
+def _mean_pool_normalize(tokens: torch.Tensor) -> torch.Tensor:
+    """
+    Mean-pool (B, N, D) tokens in FP32 and L2-normalize the result.
+
+    Written with rsqrt instead of F.normalize so Inductor can fuse the
+    pooling and normalization into one pass. eps matches F.normalize.
+    """
+    pooled = tokens.mean(dim=1, dtype=torch.float32)
+    return pooled * torch.rsqrt(pooled.square().sum(dim=-1, keepdim=True).clamp_min(1e-24))
+
 
 class VJEPA2Encoder(nn.Module):
     """
@@ -36,90 +57,376 @@ class VJEPA2Encoder(nn.Module):
 
     MODEL_ID = "facebook/vjepa2-vitg-fpc64-384"
     LICENSE = "MIT + Apache-2.0"
+    MAX_CUDA_GRAPHS = 8  # each captured graph keeps its own activation pool
+    FRAME_BUCKETS = (1, 4, 8, 16, 32, 64)
+
+    # Process-wide backbones keyed by (MODEL_ID, device); eval-only forwards
+    # are safe to share across encoders and threads
+    _backbone_cache: Dict[Tuple[str, str], Tuple[nn.Module, bool]] = {}
+    _backbone_cache_lock = threading.Lock()
 
-    def __init__(self, device: str = "cuda"):
+    def __init__(
+        self,
+        device: str = "cuda",
+        compile_model: bool = False,
+        cuda_graphs: bool = False,
+        bucket_clips: bool = False
+    ):
         super().__init__()
         self.device = torch.device(device if torch.cuda.is_available() else "cpu")
 
         logger.info(f"Loading V-JEPA 2 from {self.MODEL_ID}")
         logger.info(f"License: {self.LICENSE}")
 
+        # Reduced-precision weights on GPU (BF16 on Ampere+, FP16 before);
+        # forwards run under autocast and embeddings are normalized and
+        # compared in FP32, so thresholds like 0.98 aren't lost in FP16 noise
+        self.amp_dtype = get_autocast_dtype(self.device)
+
+        # Backbones are shared by every encoder on the same device
+        self.channels_last = prefers_channels_last(self.device)
+        cache_key = (self.MODEL_ID, str(self.device))
+        with self._backbone_cache_lock:
+            if cache_key not in self._backbone_cache:
+                self._backbone_cache[cache_key] = self._load_backbone()
+            self.model, self.use_hf = self._backbone_cache[cache_key]
+
+        if self.use_hf:
+            self.embed_dim = self.model.config.hidden_size
+        else:
+            self.embed_dim = self.model.embed_dim
+            # Add temporal projection, allocated on device in its final dtype.
+            # Per instance; it's a single small Linear.
+            self.temporal_proj = nn.Linear(
+                self.embed_dim, self.embed_dim, device=self.device, dtype=self.amp_dtype
+            )
+
+        # Fuse the ViT block ops with Inductor. Clip length varies per call;
+        # see bucket_clips below for padding clips to a few fixed lengths.
+        self.compiled = compile_model
+        if compile_model:
+            self.model = torch.compile(self.model, mode="reduce-overhead")
+            self._pool_normalize = torch.compile(_mean_pool_normalize, dynamic=True)
+        else:
+            self._pool_normalize = _mean_pool_normalize
+
+        # Replay backbone forwards from CUDA graphs captured per input shape
+        # on first use. Skipped when compiled: reduce-overhead mode already
+        # uses CUDA graphs.
+        self._graph_runners: Optional[Dict[Tuple[int, ...], CUDAGraphRunner]] = None
+        if cuda_graphs and self.device.type == "cuda" and not self.compiled:
+            self._graph_runners = {}
+            self._graph_lock = threading.Lock()
+
+        # With compiled or graph-captured forwards, pad frame counts up to
+        # FRAME_BUCKETS so calls reuse a few shapes instead of one per count.
+        # Exact for the DINOv2 fallback (padding frames get no weight);
+        # V-JEPA 2 clips are padded with their last frame, which shifts the
+        # clip embedding slightly, so that needs bucket_clips as well.
+        self._bucket_frames = self.compiled or self._graph_runners is not None
+        self._bucket_clips = self._bucket_frames and bucket_clips and self.use_hf
+
+        # Normalization constants for raw uint8 frames, preprocessed on device
+        register_pixel_stats(self, self.device)
+
+        # Fallback temporal pooling weights by sequence length
+        self._recency_weight_cache: Dict[int, torch.Tensor] = {}
+
+        # Reused pinned/device staging buffers for frame uploads
+        self._input_buffer = InputBuffer(self.device) if self.device.type == "cuda" else None
+
+        # Side stream for uploading the next clip-length group while the
+        # current one runs (see _stream_batches)
+        self._copy_stream = torch.cuda.Stream(self.device) if self.device.type == "cuda" else None
+
+        logger.info(f"V-JEPA 2 loaded: embed_dim={self.embed_dim}, device={self.device}, use_hf={self.use_hf}, compiled={self.compiled}, cuda_graphs={self._graph_runners is not None}")
+
+    def _load_backbone(self) -> Tuple[nn.Module, bool]:
+        """
+        Load the backbone in eval mode on device.
+
+        Returns:
+            (model, use_hf); use_hf is False for the DINOv2 fallback
+        """
         try:
             # Try to load V-JEPA 2 from HuggingFace
-            from transformers import AutoModel, AutoProcessor
-            self.processor = AutoProcessor.from_pretrained(self.MODEL_ID, trust_remote_code=True)
-            self.model = AutoModel.from_pretrained(self.MODEL_ID, trust_remote_code=True)
-            self.use_hf = True
-            self.embed_dim = self.model.config.hidden_size
+            from transformers import AutoModel
+            model = AutoModel.from_pretrained(
+                self.MODEL_ID, trust_remote_code=True, **self._hf_load_kwargs()
+            )
+            use_hf = True
         except Exception as e:
             logger.warning(f"Could not load V-JEPA 2 from HuggingFace: {e}")
             logger.info("Falling back to DINOv2-based sequence encoder")
             # Fallback to DINOv2 with temporal modeling
-            self.model = torch.hub.load('facebookresearch/dinov2', 'dinov2_vitg14')
-            self.use_hf = False
-            self.embed_dim = self.model.embed_dim
-            # Add temporal projection
-            self.temporal_proj = nn.Linear(self.embed_dim, self.embed_dim)
+            model = torch.hub.load('facebookresearch/dinov2', 'dinov2_vitg14')
+            use_hf = False
 
-        self.model.to(self.device)
-        self.model.eval()
+        model.eval()
 
-        # Use FP16 for efficiency
-        if self.device.type == "cuda":
-            self.model = self.model.half()
-            if hasattr(self, 'temporal_proj'):
-                self.temporal_proj = self.temporal_proj.half().to(self.device)
+        # V-JEPA 2 embeds tubelets with a Conv3d, the DINOv2 fallback
+        # patches with a Conv2d; inputs are converted in _forward
+        memory_format = torch.channels_last_3d if use_hf else torch.channels_last
+        place_model(model, self.device, self.amp_dtype, self.channels_last, memory_format)
 
-        logger.info(f"V-JEPA 2 loaded: embed_dim={self.embed_dim}, device={self.device}, use_hf={self.use_hf}")
+        return model, use_hf
 
-    @torch.no_grad()
-    def encode_frames(self, frames: List[torch.Tensor]) -> torch.Tensor:
+    def _hf_load_kwargs(self) -> dict:
+        """
+        from_pretrained arguments that load weights straight into their
+        final dtype and device.
+
+        Without accelerate the checkpoint is still read in the target dtype,
+        but it is materialized on the host first.
+        """
+        kwargs = {"torch_dtype": self.amp_dtype or torch.float32}
+        try:
+            import accelerate  # noqa: F401
+            kwargs.update(low_cpu_mem_usage=True, device_map={"": str(self.device)})
+        except ImportError:
+            logger.info("accelerate not installed, loading V-JEPA 2 on the host first")
+        return kwargs
+
+    @torch.inference_mode()
+    def encode_frames(self, frames: Frames) -> torch.Tensor:
         """
         Encode a sequence of frames.
 
         V-JEPA 2 processes frames as a video, understanding temporal relationships.
 
         Args:
-            frames: List of tensors, each (3, H, W)
+            frames: List of tensors, each (3, H, W), or one stacked
+                (T, 3, H, W) tensor. A stacked tensor is the fast path: it
+                is uploaded with a single copy and never split into frames.
+                Preprocessed float frames, or raw uint8 frames that are
+                preprocessed on device.
 
         Returns:
             Sequence embedding (1, embed_dim) that captures temporal dynamics
         """
-        if self.use_hf:
-            # Stack frames into video tensor (1, T, C, H, W)
-            video = torch.stack(frames).unsqueeze(0).to(self.device)
-            if self.device.type == "cuda":
-                video = video.half()
+        return self._encode_sequences([frames])
+
+    @torch.inference_mode()
+    def encode_single(self, frame: torch.Tensor) -> torch.Tensor:
+        """Encode single frame (treats as 1-frame video)"""
+        return self.encode_frames([frame])
 
-            # Process through V-JEPA 2
-            outputs = self.model(video)
+    @torch.inference_mode()
+    def encode_batch(self, frames: Frames) -> torch.Tensor:
+        """
+        Encode independent frames in one forward.
 
-            # Get sequence-level embedding
-            embedding = outputs.last_hidden_state.mean(dim=1)
-        else:
-            # Fallback: encode each frame with DINOv2 and model temporally
-            batch = torch.stack(frames).to(self.device)
-            if self.device.type == "cuda":
-                batch = batch.half()
+        Returns:
+            Normalized embeddings of shape (len(frames), embed_dim)
+        """
+        return self._encode_batch_frames(frames)
+
+    @torch.inference_mode()
+    def _encode_batch_frames(self, frames: Frames) -> torch.Tensor:
+        """
+        Encode each frame independently in a single forward.
 
-            frame_embeddings = self.model(batch)  # (T, embed_dim)
+        Row i matches encode_single(frames[i]).
 
-            # Simple temporal modeling: weighted average with recency bias
-            weights = torch.linspace(0.5, 1.0, len(frames), device=self.device)
-            weights = weights / weights.sum()
-            embedding = (frame_embeddings * weights.unsqueeze(1)).sum(dim=0, keepdim=True)
+        Returns:
+            Normalized embeddings of shape (len(frames), embed_dim)
+        """
+        return self._encode_sequences([[frame] for frame in frames])
+
+    def _encode_sequences(self, sequences: Sequence[Frames]) -> torch.Tensor:
+        """
+        Encode several frame sequences with as few forwards as possible.
+
+        V-JEPA 2 needs a fixed clip length per batch, so sequences of equal
+        length share one forward. The DINOv2 fallback encodes every frame of
+        every sequence in a single forward and pools per sequence.
+
+        Returns:
+            Normalized embeddings of shape (len(sequences), embed_dim); row i
+            matches encode_frames(sequences[i])
+        """
+        if self.use_hf:
+            by_length: Dict[int, List[int]] = {}
+            for idx, seq in enumerate(sequences):
+                length = self._bucket(len(seq)) if self._bucket_clips else len(seq)
+                by_length.setdefault(length, []).append(idx)
+
+            groups = list(by_length.items())
+            batches = [self._gather([sequences[idx] for idx in indices], length) for length, indices in groups]
+
+            embeddings: List[Optional[torch.Tensor]] = [None] * len(sequences)
+            for batch, (length, indices) in zip(self._stream_batches(batches), groups):
+                # View as video tensor (B, T, C, H, W)
+                videos = batch.view(len(indices), -1, *batch.shape[1:])
+
+                # Process through V-JEPA 2, sequence-level embedding per video
+                pooled = self._backbone(videos)
+                for idx, embedding in zip(indices, pooled):
+                    embeddings[idx] = embedding
+            embedding = torch.stack(embeddings)
+        else:
+            # Fallback: encode all frames with DINOv2 and model each sequence temporally
+            lengths = [len(seq) for seq in sequences]
+            frames = self._gather(sequences)
+            total = sum(lengths)
+            if self._bucket_frames and self._bucket(total) > total:
+                frames = list(frames) + [frames[-1]] * (self._bucket(total) - total)
+            with self._stage(frames) as batch:
+                frame_embeddings = self._backbone(batch)[:total]  # (sum(lengths), embed_dim)
+
+            # Simple temporal modeling: weighted average with recency bias.
+            # A block-diagonal (num_sequences, sum(lengths)) weight matrix
+            # pools every sequence in one matmul.
+            weights = torch.block_diag(*[self._recency_weights(length) for length in lengths])
+            pooled = weights.to(frame_embeddings.dtype) @ frame_embeddings
 
             # Project through temporal layer
-            embedding = self.temporal_proj(embedding)
+            with autocast_context(self.device, self.amp_dtype):
+                embedding = self.temporal_proj(pooled)
+
+            # Normalize in FP32
+            embedding = F.normalize(embedding.float(), p=2, dim=-1)
+
+        return embedding
+
+    def _recency_weights(self, length: int) -> torch.Tensor:
+        """(1, length) normalized weights ramping 0.5 -> 1.0, cached per length"""
+        weights = self._recency_weight_cache.get(length)
+        if weights is None:
+            weights = torch.linspace(0.5, 1.0, length, device=self.device)
+            weights = (weights / weights.sum()).unsqueeze(0)
+            self._recency_weight_cache[length] = weights
+        return weights
+
+    def _bucket(self, count: int) -> int:
+        """Smallest FRAME_BUCKETS entry >= count; multiples of the largest beyond it"""
+        for bucket in self.FRAME_BUCKETS:
+            if bucket >= count:
+                return bucket
+        largest = self.FRAME_BUCKETS[-1]
+        return -(-count // largest) * largest
+
+    @staticmethod
+    def _gather(sequences: Sequence[Frames], length: Optional[int] = None) -> Frames:
+        """
+        Concatenate sequences for staging, padding each to length frames by
+        repeating its last frame. A lone stacked tensor that needs no
+        padding passes through untouched.
+        """
+        if len(sequences) == 1 and isinstance(sequences[0], torch.Tensor):
+            if length is None or len(sequences[0]) == length:
+                return sequences[0]
+
+        frames = []
+        for seq in sequences:
+            frames.extend(seq)
+            if length is not None:
+                frames.extend([seq[-1]] * (length - len(seq)))
+        return frames
+
+    @contextlib.contextmanager
+    def _stage(self, frames: Frames):
+        """
+        Context manager yielding frames as one preprocessed (N, C, H, W)
+        device batch.
 
-        return F.normalize(embedding, p=2, dim=-1)
+        CPU frames are stacked into the reused pinned/device buffers; the
+        batch is only valid inside the with-block. Raw uint8 frames (all the
+        same size) are uploaded as uint8 and resized/normalized on device,
+        a quarter of the upload and none of the per-frame CPU transform.
+        """
+        if self._input_buffer is not None and frames[0].device.type == "cpu":
+            staged = self._input_buffer.stage(frames)
+        else:
+            stacked = frames if isinstance(frames, torch.Tensor) else torch.stack(frames)
+            staged = contextlib.nullcontext(stacked.to(self.device))
 
-    @torch.no_grad()
-    def encode_single(self, frame: torch.Tensor) -> torch.Tensor:
-        """Encode single frame (treats as 1-frame video)"""
-        return self.encode_frames([frame])
+        with staged as batch:
+            if batch.dtype == torch.uint8:
+                batch = preprocess_uint8(batch, self._pixel_mean, self._pixel_std)
+            yield batch
+
+    def _stream_batches(self, batches: List[Frames]):
+        """
+        Yield each of batches as a preprocessed device batch, uploading
+        batch i+1 on the copy stream while the caller computes on batch i.
 
-    @torch.no_grad()
+        Single batches and device frames go through _stage; each yielded
+        batch is only valid until the next one is requested.
+        """
+        if self._copy_stream is None or len(batches) < 2 or batches[0][0].device.type != "cpu":
+            for frames in batches:
+                with self._stage(frames) as batch:
+                    yield batch
+            return
+
+        compute_stream = torch.cuda.current_stream(self.device)
+
+        def upload(frames: Frames) -> torch.Tensor:
+            host = (frames if isinstance(frames, torch.Tensor) else torch.stack(frames)).pin_memory()
+            with torch.cuda.stream(self._copy_stream):
+                return host.to(self.device, non_blocking=True)
+
+        pending = upload(batches[0])
+        for i in range(len(batches)):
+            batch = pending
+            # Wait only for copies issued so far, i.e. this batch
+            compute_stream.wait_stream(self._copy_stream)
+            batch.record_stream(compute_stream)
+
+            if i + 1 < len(batches):
+                pending = upload(batches[i + 1])
+
+            if batch.dtype == torch.uint8:
+                batch = preprocess_uint8(batch, self._pixel_mean, self._pixel_std)
+            yield batch
+
+    def _backbone(self, inputs: torch.Tensor) -> torch.Tensor:
+        """Backbone features for a device batch, replayed from a CUDA graph when enabled"""
+        if self._graph_runners is None or torch.is_grad_enabled():
+            return self._forward(inputs)
+
+        key = tuple(inputs.shape)
+        with self._graph_lock:
+            runner = self._graph_runners.get(key)
+            if runner is None and len(self._graph_runners) < self.MAX_CUDA_GRAPHS:
+                runner = CUDAGraphRunner(self._forward, inputs)
+                self._graph_runners[key] = runner
+
+        if runner is None:
+            return self._forward(inputs)
+        return runner(inputs)
+
+    def _forward(self, inputs: torch.Tensor) -> torch.Tensor:
+        """
+        Run the backbone under autocast.
+
+        Returns one (B, D) embedding per input: the normalized FP32 clip
+        embedding for V-JEPA 2, the raw CLS features for the DINOv2
+        fallback (pooled and projected before normalizing).
+        """
+        if self.channels_last:
+            # Store every frame NHWC. Videos are (B, T, C, H, W) and V-JEPA 2
+            # permutes them to (B, C, T, H, W), which makes them
+            # channels_last_3d for its Conv3d.
+            frames = inputs.flatten(0, inputs.dim() - 4)
+            inputs = frames.contiguous(memory_format=torch.channels_last).view(inputs.shape)
+
+        with autocast_context(self.device, self.amp_dtype):
+            outputs = self.model(inputs)
+        if not self.use_hf:
+            return outputs
+
+        # Prefer the model's own pooled output. V-JEPA 2 has no CLS token,
+        # so otherwise mean-pool the tokens, accumulating in FP32. Pooling
+        # here keeps it inside a captured CUDA graph, which then only
+        # copies out (B, D) instead of every token.
+        pooled = getattr(outputs, "pooler_output", None)
+        if pooled is not None:
+            return F.normalize(pooled.float(), p=2, dim=-1)
+        return self._pool_normalize(outputs.last_hidden_state)
+
+    @torch.inference_mode()
     def compare_sequences(
         self,
         seq1: List[torch.Tensor],
@@ -134,10 +441,9 @@ class VJEPA2Encoder(nn.Module):
         Returns:
             (similarity_score, analysis_text)
         """
-        emb1 = self.encode_frames(seq1)
-        emb2 = self.encode_frames(seq2)
+        embeddings = self._encode_sequences([seq1, seq2])
 
-        similarity = F.cosine_similarity(emb1, emb2, dim=-1).item()
+        similarity = normalized_similarity(embeddings[0], embeddings[1]).item()
 
         # Generate analysis based on similarity
         if similarity > 0.95:
@@ -151,7 +457,7 @@ class VJEPA2Encoder(nn.Module):
 
         return similarity, analysis
 
-    @torch.no_grad()
+    @torch.inference_mode()
     def detect_stability(
         self,
         frames: List[torch.Tensor],
@@ -172,35 +478,23 @@ class VJEPA2Encoder(nn.Module):
         if len(frames) < 2:
             return True, 0, 1.0, "Single frame - assuming stable"
 
-        # Encode each frame
-        embeddings = []
-        for f in frames:
-            emb = self.encode_single(f)
-            embeddings.append(emb)
+        # Encode all frames in one forward
+        embeddings = self._encode_batch_frames(frames)
 
         # Compare consecutive frames
-        similarities = []
-        for i in range(len(embeddings) - 1):
-            sim = F.cosine_similarity(embeddings[i], embeddings[i+1], dim=-1).item()
-            similarities.append(sim)
-
-        # Find first stable point (consecutive high-similarity pairs)
-        stable_count = 0
-        stable_at = -1
-
-        for i, sim in enumerate(similarities):
-            if sim >= threshold:
-                stable_count += 1
-                if stable_count >= 2 and stable_at == -1:
-                    stable_at = i
-            else:
-                stable_count = 0
-                stable_at = -1
+        similarities = normalized_similarity(embeddings[:-1], embeddings[1:])
 
-        is_stable = stable_count >= 2
+        # Stability needs the trailing run of high-similarity pairs to be at
+        # least two long; that run starts one past the last low pair
+        positions = torch.arange(1, len(similarities) + 1, device=similarities.device)
+        run_start = positions.masked_fill(similarities >= threshold, 0).max()
 
-        # Calculate overall stability score
-        stability_score = sum(similarities) / len(similarities) if similarities else 1.0
+        # Calculate overall stability score; one device->host sync
+        stability_score, run_start = torch.stack([similarities.mean(), run_start.float()]).tolist()
+        run_start = int(run_start)
+
+        is_stable = len(similarities) - run_start >= 2
+        stable_at = run_start + 1 if is_stable else -1
 
         # Analyze activity type
         avg_motion = 1 - stability_score
@@ -215,7 +509,7 @@ class VJEPA2Encoder(nn.Module):
 
         return is_stable, stable_at if stable_at >= 0 else len(frames)-1, stability_score, activity
 
-    @torch.no_grad()
+    @torch.inference_mode()
     def validate_healing(
         self,
         before_frames: List[torch.Tensor],
@@ -236,20 +530,17 @@ class VJEPA2Encoder(nn.Module):
         Returns:
             (is_valid, semantic_similarity, state_confidence, analysis)
         """
-        # Encode the actual transition
-        actual_transition = before_frames + after_frames
-        actual_emb = self.encode_frames(actual_transition)
-
-        # Encode the expected outcome
-        expected_emb = self.encode_frames(expected_frames)
-
-        # Also compare just the final states
-        actual_final = self.encode_single(after_frames[-1])
-        expected_final = self.encode_single(expected_frames[-1])
+        # Encode the actual transition, the expected outcome and just the
+        # final states together
+        embeddings = self._encode_sequences([
+            before_frames + after_frames,
+            expected_frames,
+            [after_frames[-1]],
+            [expected_frames[-1]],
+        ])
 
         # Combined similarity (transition + final state)
-        transition_sim = F.cosine_similarity(actual_emb, expected_emb, dim=-1).item()
-        final_sim = F.cosine_similarity(actual_final, expected_final, dim=-1).item()
+        transition_sim, final_sim = normalized_similarity(embeddings[0::2], embeddings[1::2]).tolist()
 
         # Weight final state more heavily for healing validation
         combined_sim = 0.3 * transition_sim + 0.7 * final_sim
@@ -267,7 +558,7 @@ class VJEPA2Encoder(nn.Module):
 
         return is_valid, combined_sim, state_confidence, analysis
 
-    @torch.no_grad()
+    @torch.inference_mode()
     def analyze_change(
         self,
         before: torch.Tensor,
@@ -280,10 +571,9 @@ class VJEPA2Encoder(nn.Module):
         Returns:
             (description, changes_list, expected_change, confidence)
         """
-        before_emb = self.encode_single(before)
-        after_emb = self.encode_single(after)
+        embeddings = self._encode_batch_frames([before, after])
 
-        similarity = F.cosine_similarity(before_emb, after_emb, dim=-1).item()
+        similarity = normalized_similarity(embeddings[0], embeddings[1]).item()
         change_magnitude = 1 - similarity
 
         # Determine change type
@@ -317,6 +607,10 @@ class VJEPA2Encoder(nn.Module):
 
         return description, changes, expected, confidence
 
+    def warmup(self):
+        """Prime compiled/graph-captured forwards for single and batched frames"""
+        warmup_encoder(self)
+
     def get_info(self) -> dict:
         """Get model info"""
         return {
@@ -325,4 +619,6 @@ class VJEPA2Encoder(nn.Module):
             "embed_dim": self.embed_dim,
             "device": str(self.device),
             "use_hf": self.use_hf,
+            "compiled": self.compiled,
+            "channels_last": self.channels_last,
         }
@@ -8,7 +8,8 @@ Routing Strategy:
 """
 
 from enum import Enum
-from typing import Optional, List, Dict
+from functools import lru_cache
+from typing import Optional, List, Dict, Iterable, Set, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,6 +26,12 @@ class TaskType(Enum):
     CHANGE_ANALYSIS = "change_analysis"         # Analyze what changed
 
 
+@lru_cache(maxsize=None)
+def _warn_fallback(task_type: TaskType, preferred: str, chosen: str):
+    """Log a routing fallback once per process"""
+    logger.warning("%s not available, falling back to %s for %s", preferred, chosen, task_type)
+
+
 class ModelRouter:
     """
     Intelligent routing between visual AI models.
@@ -74,9 +81,33 @@ class ModelRouter:
     }
 
     def __init__(self, available_models: List[str]):
-        self.available_models = set(available_models)
+        self.available_models = available_models
         logger.info(f"Router initialized with models: {list(available_models)}")
 
+    @property
+    def available_models(self) -> Set[str]:
+        return self._available_models
+
+    @available_models.setter
+    def available_models(self, models: Iterable[str]):
+        """Set the loaded models and rebuild the dispatch table"""
+        self._available_models = set(models)
+
+        # Routing only depends on the task, single vs multi-frame and the
+        # accuracy flag, so every decision is resolved once up front
+        self._dispatch: Dict[Tuple[TaskType, bool, bool], Optional[str]] = {
+            (task_type, multi_frame, high_accuracy): self._resolve(task_type, multi_frame, high_accuracy)
+            for task_type in TaskType
+            for multi_frame in (False, True)
+            for high_accuracy in (False, True)
+        }
+
+        for task_type in TaskType:
+            preferred = self.ROUTING_TABLE.get(task_type, "dinov2")
+            fallback = self._dispatch[(task_type, False, False)]
+            if fallback is not None and preferred not in self._available_models:
+                _warn_fallback(task_type, preferred, fallback)
+
     def route(
         self,
         task_type: TaskType,
@@ -97,35 +128,38 @@ class ModelRouter:
             Model name to use
         """
         # Explicit model requested
-        if explicit_model and explicit_model in self.available_models:
+        if explicit_model and explicit_model in self._available_models:
             return explicit_model
 
+        model = self._dispatch[(task_type, frame_count > 1, needs_high_accuracy)]
+        if model is None:
+            raise RuntimeError("No models available")
+        return model
+
+    def _resolve(self, task_type: TaskType, multi_frame: bool, needs_high_accuracy: bool) -> Optional[str]:
+        """Routing decision for one dispatch-table entry; None if no model is loaded"""
         # Get default routing
         preferred = self.ROUTING_TABLE.get(task_type, "dinov2")
 
         # Fallback logic if preferred model not available
-        if preferred not in self.available_models:
+        if preferred not in self._available_models:
             # V-JEPA 2 -> DINOv2 fallback (loses sequence understanding)
-            if preferred == "vjepa2" and "dinov2" in self.available_models:
-                logger.warning(f"V-JEPA 2 not available, falling back to DINOv2 for {task_type}")
-                return "dinov2"
             # SigLIP -> DINOv2 fallback (loses text alignment)
-            if preferred == "siglip" and "dinov2" in self.available_models:
-                logger.warning(f"SigLIP not available, falling back to DINOv2 for {task_type}")
+            if preferred in ("vjepa2", "siglip") and "dinov2" in self._available_models:
                 return "dinov2"
             # Use whatever is available
-            if self.available_models:
-                return list(self.available_models)[0]
-            raise RuntimeError("No models available")
+            if self._available_models:
+                return sorted(self._available_models)[0]
+            return None
 
         # Special routing rules
-        if frame_count > 1 and "vjepa2" in self.available_models:
+        if multi_frame and "vjepa2" in self._available_models:
             # Multi-frame tasks benefit from V-JEPA 2
             return "vjepa2"
 
         if needs_high_accuracy and task_type == TaskType.HEALING_VALIDATION:
             # Critical tasks use V-JEPA 2 if available
-            if "vjepa2" in self.available_models:
+            if "vjepa2" in self._available_models:
                 return "vjepa2"
 
         return preferred
@@ -134,7 +168,7 @@ class ModelRouter:
         """Get info about model(s)"""
         if model_name:
             return self.MODEL_INFO.get(model_name, {})
-        return {k: v for k, v in self.MODEL_INFO.items() if k in self.available_models}
+        return {k: v for k, v in self.MODEL_INFO.items() if k in self._available_models}
 
     def explain_routing(self, task_type: TaskType) -> str:
         """Explain why a model was chosen for a task"""
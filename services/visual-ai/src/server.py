@@ -8,12 +8,16 @@ Models (all commercially safe):
 """
 
 import grpc
+from collections import OrderedDict
 from concurrent import futures
+import functools
 import logging
+import numpy as np
 import torch
 from typing import Dict, Optional, List
 import os
 import sys
+import threading
 import time
 
 # Add parent directory to path for proto imports
@@ -24,19 +28,47 @@ from router import ModelRouter, TaskType
 from models.dinov2 import DINOv2Encoder
 from models.vjepa2 import VJEPA2Encoder
 from models.siglip import SigLIPEncoder
+from models.base import normalized_similarity, describe_similarity, describe_similarities, MicroBatcher
 from utils import (
     load_image, preprocess_frame, preprocess_frames,
-    load_and_preprocess, load_and_preprocess_many,
-    tensor_to_bytes, calculate_changed_regions,
+    load_and_preprocess, load_and_preprocess_many, load_uint8, load_uint8_many, normalize_uint8,
+    tensor_to_bytes, calculate_changed_regions, source_key,
     get_device, get_gpu_memory_info
 )
 
+# Let the caching allocator grow segments in place instead of splitting
+# fixed-size blocks; read on first CUDA allocation, so set before any model loads
+os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True")
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
+# Explicit model requests per RPC; MODEL_AUTO (and SigLIP for comparisons)
+# is left to the router
+_EMBEDDING_MODELS = {
+    visual_ai_pb2.MODEL_DINOV2: "dinov2",
+    visual_ai_pb2.MODEL_VJEPA2: "vjepa2",
+    visual_ai_pb2.MODEL_SIGLIP: "siglip",
+}
+_COMPARE_MODELS = {
+    visual_ai_pb2.MODEL_DINOV2: "dinov2",
+    visual_ai_pb2.MODEL_VJEPA2: "vjepa2",
+}
+
+
+def _releases_cached_memory(handler):
+    """Trim the CUDA cache, if it has grown, after a model RPC runs."""
+    @functools.wraps(handler)
+    def wrapper(self, request, context):
+        try:
+            return handler(self, request, context)
+        finally:
+            self._release_cached_memory()
+    return wrapper
+
 
 class VisualAIServicer(visual_ai_pb2_grpc.VisualAIServiceServicer):
     """
@@ -48,19 +80,52 @@ class VisualAIServicer(visual_ai_pb2_grpc.VisualAIServiceServicer):
     - SigLIP: Text-image search (Apache 2.0)
     """
 
+    # Number of recent inference times averaged for HealthCheck
+    INFERENCE_TIME_WINDOW = 100
+
     def __init__(self, config: dict):
         self.device = config.get("device", get_device())
         self.models: Dict[str, any] = {}
-        self.inference_times: Dict[str, List[float]] = {}
+        self.inference_times: Dict[str, np.ndarray] = {}
+        self.inference_counts: Dict[str, int] = {}
+
+        # Cap this process's share of the GPU and remember when to hand
+        # cached-but-unused blocks back (variable frame counts fragment
+        # the caching allocator)
+        self._cache_release_bytes = None
+        if self.device == "cuda":
+            memory_fraction = config.get("memory_fraction")
+            if memory_fraction:
+                torch.cuda.set_per_process_memory_fraction(memory_fraction)
+            self._cache_release_bytes = int(config.get("cache_release_mb", 2048)) * 1024 * 1024
+
+        # The gRPC pool is sized for I/O; cap how many RPCs run encoder
+        # forwards at once so concurrent clients don't thrash the GPU.
+        # Loading, decoding and region work stay outside the slot.
+        self._inflight = threading.BoundedSemaphore(config.get("max_inflight", 8))
+
+        # LRU of embeddings keyed by (model, image source)
+        self.embedding_cache_size = config.get("embedding_cache_size", 4096)
+        self._embedding_cache: "OrderedDict[tuple, torch.Tensor]" = OrderedDict()
+        self._embedding_cache_lock = threading.Lock()
 
         # Load requested models
         models_to_load = config.get("models", ["dinov2"])
+        quantize = config.get("quantize", False)
+        compile_model = config.get("compile", False)
 
         if "dinov2" in models_to_load:
             logger.info("Loading DINOv2 (Apache 2.0)...")
             try:
-                self.models["dinov2"] = DINOv2Encoder(self.device)
-                self.inference_times["dinov2"] = []
+                self.models["dinov2"] = DINOv2Encoder(
+                    self.device,
+                    quantize=quantize,
+                    compile_model=compile_model,
+                    weights_path=config.get("dinov2_weights"),
+                    cuda_graphs=config.get("cuda_graphs", False),
+                    trt_engine=config.get("dinov2_trt_engine") if config.get("backend") == "trt" else None,
+                )
+                self._track_inference_times("dinov2")
                 logger.info("DINOv2 loaded successfully")
             except Exception as e:
                 logger.error(f"Failed to load DINOv2: {e}")
@@ -68,8 +133,13 @@ class VisualAIServicer(visual_ai_pb2_grpc.VisualAIServiceServicer):
         if "vjepa2" in models_to_load:
             logger.info("Loading V-JEPA 2 (MIT + Apache 2.0)...")
             try:
-                self.models["vjepa2"] = VJEPA2Encoder(self.device)
-                self.inference_times["vjepa2"] = []
+                self.models["vjepa2"] = VJEPA2Encoder(
+                    self.device,
+                    compile_model=compile_model,
+                    cuda_graphs=config.get("cuda_graphs", False),
+                    bucket_clips=config.get("vjepa2_bucket_clips", False),
+                )
+                self._track_inference_times("vjepa2")
                 logger.info("V-JEPA 2 loaded successfully")
             except Exception as e:
                 logger.error(f"Failed to load V-JEPA 2: {e}")
@@ -77,49 +147,137 @@ class VisualAIServicer(visual_ai_pb2_grpc.VisualAIServiceServicer):
         if "siglip" in models_to_load:
             logger.info("Loading SigLIP (Apache 2.0)...")
             try:
-                self.models["siglip"] = SigLIPEncoder(self.device)
-                self.inference_times["siglip"] = []
+                self.models["siglip"] = SigLIPEncoder(
+                    self.device,
+                    quantize=quantize,
+                    compile_model=compile_model,
+                    load_mode=config.get("siglip_load_mode", "both"),
+                )
+                self._track_inference_times("siglip")
                 logger.info("SigLIP loaded successfully")
             except Exception as e:
                 logger.error(f"Failed to load SigLIP: {e}")
 
+        # Compile and capture CUDA graphs for the fixed 384x384 shapes
+        # before serve() opens the port
+        if compile_model:
+            self._warmup()
+
+        # Optionally coalesce concurrent single-image encodes per model
+        self.batchers: Dict[str, MicroBatcher] = {}
+        if config.get("microbatch", False):
+            for name, encoder in self.models.items():
+                self.batchers[name] = MicroBatcher(
+                    encoder.encode_batch,
+                    max_batch=config.get("microbatch_size", 16),
+                    max_wait_ms=config.get("microbatch_wait_ms", 4.0),
+                    name=name,
+                )
+
         # Initialize router
         self.router = ModelRouter(list(self.models.keys()))
 
         logger.info(f"Visual AI service ready with models: {list(self.models.keys())}")
 
+    def _warmup(self):
+        """Prime compiled encoders for single-frame and batched requests"""
+        for name, encoder in self.models.items():
+            start = time.time()
+            try:
+                encoder.warmup()
+                logger.info(f"{name} warmed up in {time.time() - start:.1f}s")
+            except Exception as e:
+                logger.warning(f"Warm-up failed for {name}: {e}")
+
+    def _release_cached_memory(self):
+        """Empty the CUDA cache when reserved-but-unallocated memory exceeds the limit"""
+        if self._cache_release_bytes is None:
+            return
+        if torch.cuda.memory_reserved() - torch.cuda.memory_allocated() > self._cache_release_bytes:
+            torch.cuda.empty_cache()
+
+    def _encode_batch(self, model_name: str, encoder, frames: List[torch.Tensor]) -> torch.Tensor:
+        """Encode frames, through the model's micro-batcher when enabled"""
+        batcher = self.batchers.get(model_name)
+        if batcher is not None:
+            # The batcher's worker is the only caller into the model
+            return batcher.encode(frames)
+        with self._inflight:
+            return encoder.encode_batch(frames).reshape(len(frames), -1)
+
+    def _embed_sources(self, model_name: str, encoder, sources: List) -> torch.Tensor:
+        """
+        Embeddings (N, embed_dim) for image sources.
+
+        Embeddings are cached per (model, source) so a baseline compared
+        against many actuals is only encoded once. Misses are loaded in
+        parallel and encoded in a single forward.
+        """
+        keys = [(model_name, source_key(s)) for s in sources]
+        embeddings = [None] * len(sources)
+        with self._embedding_cache_lock:
+            for i, key in enumerate(keys):
+                embedding = self._embedding_cache.get(key)
+                if embedding is not None:
+                    self._embedding_cache.move_to_end(key)
+                    embeddings[i] = embedding
+
+        missing = [i for i, e in enumerate(embeddings) if e is None]
+        if missing:
+            # Each distinct source is loaded and encoded once per call
+            pending = {}
+            for i in missing:
+                pending.setdefault(keys[i], sources[i])
+            frames = load_uint8_many(list(pending.values()))
+            encoded = dict(zip(pending, self._encode_batch(model_name, encoder, frames)))
+
+            with self._embedding_cache_lock:
+                for key, embedding in encoded.items():
+                    self._embedding_cache[key] = embedding
+                while len(self._embedding_cache) > self.embedding_cache_size:
+                    self._embedding_cache.popitem(last=False)
+
+            for i in missing:
+                embeddings[i] = encoded[keys[i]]
+
+        return torch.stack(embeddings)
+
     def _get_model(self, task_type: TaskType, explicit_model: Optional[str] = None):
         """Get the appropriate model for a task"""
         model_name = self.router.route(task_type, explicit_model)
         return model_name, self.models.get(model_name)
 
+    def _track_inference_times(self, model_name: str):
+        """Allocate the inference time ring buffer for a model"""
+        self.inference_times[model_name] = np.zeros(self.INFERENCE_TIME_WINDOW, dtype=np.float32)
+        self.inference_counts[model_name] = 0
+
     def _record_inference_time(self, model_name: str, elapsed: float):
         """Record inference time for metrics"""
-        times = self.inference_times.get(model_name, [])
-        times.append(elapsed)
-        # Keep last 100 measurements
-        if len(times) > 100:
-            times = times[-100:]
-        self.inference_times[model_name] = times
+        times = self.inference_times.get(model_name)
+        if times is None:
+            return
+        count = self.inference_counts[model_name]
+        # Overwrite the oldest of the last INFERENCE_TIME_WINDOW measurements
+        times[count % self.INFERENCE_TIME_WINDOW] = elapsed
+        self.inference_counts[model_name] = count + 1
 
     def _get_avg_inference_time(self, model_name: str) -> float:
         """Get average inference time in ms"""
-        times = self.inference_times.get(model_name, [])
-        if not times:
+        times = self.inference_times.get(model_name)
+        count = min(self.inference_counts.get(model_name, 0), self.INFERENCE_TIME_WINDOW)
+        if not count:
             return 0.0
-        return (sum(times) / len(times)) * 1000  # Convert to ms
+        return float(times[:count].mean()) * 1000  # Convert to ms
 
+    @_releases_cached_memory
+    @torch.inference_mode()
     def CompareFrames(self, request, context):
         """Compare two frames - uses DINOv2 by default (fast)"""
         start_time = time.time()
 
         # Determine model
-        explicit_model = None
-        if request.model == visual_ai_pb2.MODEL_DINOV2:
-            explicit_model = "dinov2"
-        elif request.model == visual_ai_pb2.MODEL_VJEPA2:
-            explicit_model = "vjepa2"
-
+        explicit_model = _COMPARE_MODELS.get(request.model)
         model_name, encoder = self._get_model(TaskType.COMPARE_SIMPLE, explicit_model)
 
         if encoder is None:
@@ -128,45 +286,46 @@ class VisualAIServicer(visual_ai_pb2_grpc.VisualAIServiceServicer):
             return visual_ai_pb2.CompareFramesResponse()
 
         try:
-            # Load images
             baseline_source = request.baseline_data or request.baseline_uri
             actual_source = request.actual_data or request.actual_uri
 
-            baseline = load_and_preprocess(baseline_source)
-            actual = load_and_preprocess(actual_source)
-
             # Compare
             threshold = request.settings.similarity_threshold or 0.85
-            similarity, is_similar, analysis = encoder.compare(baseline, actual, threshold)
+            embeddings = self._embed_sources(model_name, encoder, [baseline_source, actual_source])
+            similarity = normalized_similarity(embeddings[0], embeddings[1]).item()
+            is_similar = similarity >= threshold
+            analysis = describe_similarity(similarity)
 
-            # Calculate changed regions if different
-            changed_regions = []
+            response = visual_ai_pb2.CompareFramesResponse(
+                similarity_score=similarity,
+                semantic_match=is_similar,
+                confidence=0.95,
+                model_used=model_name,
+                analysis=analysis
+            )
+
+            # Calculate changed regions if different. Regions are filled in
+            # place with add() rather than built as standalone messages.
             if not is_similar:
-                raw_changes = calculate_changed_regions(baseline, actual)
-                for change in raw_changes:
-                    changed_regions.append(visual_ai_pb2.ChangedRegion(
-                        region=visual_ai_pb2.Region(
-                            x=change["x"],
-                            y=change["y"],
-                            width=change["width"],
-                            height=change["height"]
-                        ),
+                # Same uint8 frames _embed_sources loaded, from the image cache
+                baseline, actual = (
+                    normalize_uint8(f) for f in load_uint8_many([baseline_source, actual_source])
+                )
+                for change in calculate_changed_regions(baseline, actual):
+                    changed = response.changed_regions.add(
                         significance=change["significance"],
                         change_type="content",
                         description="Visual difference detected"
-                    ))
+                    )
+                    changed.region.x = change["x"]
+                    changed.region.y = change["y"]
+                    changed.region.width = change["width"]
+                    changed.region.height = change["height"]
 
             elapsed = time.time() - start_time
             self._record_inference_time(model_name, elapsed)
 
-            return visual_ai_pb2.CompareFramesResponse(
-                similarity_score=similarity,
-                semantic_match=is_similar,
-                confidence=0.95,
-                model_used=model_name,
-                analysis=analysis,
-                changed_regions=changed_regions
-            )
+            return response
 
         except Exception as e:
             logger.error(f"CompareFrames error: {e}")
@@ -174,6 +333,8 @@ class VisualAIServicer(visual_ai_pb2_grpc.VisualAIServiceServicer):
             context.set_details(str(e))
             return visual_ai_pb2.CompareFramesResponse()
 
+    @_releases_cached_memory
+    @torch.inference_mode()
     def ValidateHealing(self, request, context):
         """
         Validate self-healing using V-JEPA 2.
@@ -201,23 +362,32 @@ class VisualAIServicer(visual_ai_pb2_grpc.VisualAIServiceServicer):
                 context.set_details("No frames provided")
                 return visual_ai_pb2.ValidateHealingResponse()
 
-            # Split frames into before/after
-            mid = len(frame_sources) // 2
-            before_frames = [load_and_preprocess(f) for f in frame_sources[:max(1, mid)]]
-            after_frames = [load_and_preprocess(f) for f in frame_sources[max(1, mid):]]
-            expected_frames = [load_and_preprocess(expected_source)] if expected_source else after_frames
+            # Load the sequence and expected state in one parallel pass,
+            # then split frames into before/after
+            sources = (frame_sources + [expected_source]) if expected_source else frame_sources
+            frames = load_uint8_many(sources)
+            if expected_source:
+                frames, expected_frames = frames[:-1], frames[-1:]
+
+            mid = max(1, len(frame_sources) // 2)
+            before_frames = frames[:mid]
+            after_frames = frames[mid:]
+            if not expected_source:
+                expected_frames = after_frames
 
             threshold = request.similarity_threshold or 0.85
 
             # Validate healing
             if hasattr(encoder, 'validate_healing'):
-                is_valid, similarity, confidence, analysis = encoder.validate_healing(
-                    before_frames, after_frames, expected_frames, threshold
-                )
+                with self._inflight:
+                    is_valid, similarity, confidence, analysis = encoder.validate_healing(
+                        before_frames, after_frames, expected_frames, threshold
+                    )
             else:
                 # Fallback for DINOv2
-                actual_emb = encoder.encode_single(after_frames[-1])
-                expected_emb = encoder.encode_single(expected_frames[-1])
+                with self._inflight:
+                    actual_emb = encoder.encode_single(after_frames[-1])
+                    expected_emb = encoder.encode_single(expected_frames[-1])
                 similarity = torch.nn.functional.cosine_similarity(actual_emb, expected_emb, dim=-1).item()
                 is_valid = similarity >= threshold
                 confidence = 0.7
@@ -250,6 +420,8 @@ class VisualAIServicer(visual_ai_pb2_grpc.VisualAIServiceServicer):
             context.set_details(str(e))
             return visual_ai_pb2.ValidateHealingResponse()
 
+    @_releases_cached_memory
+    @torch.inference_mode()
     def DetectStability(self, request, context):
         """
         Detect UI stability using V-JEPA 2.
@@ -273,12 +445,13 @@ class VisualAIServicer(visual_ai_pb2_grpc.VisualAIServiceServicer):
                 context.set_details("No frames provided")
                 return visual_ai_pb2.DetectStabilityResponse()
 
-            frames = [load_and_preprocess(f) for f in frame_sources]
+            frames = load_uint8_many(frame_sources)
             threshold = request.stability_threshold or 0.98
 
             # Detect stability
             if hasattr(encoder, 'detect_stability'):
-                is_stable, stable_at, stability_score, activity = encoder.detect_stability(frames, threshold)
+                with self._inflight:
+                    is_stable, stable_at, stability_score, activity = encoder.detect_stability(frames, threshold)
             else:
                 # Fallback: simple consecutive comparison
                 is_stable, stable_at, stability_score, activity = self._simple_stability(
@@ -307,14 +480,11 @@ class VisualAIServicer(visual_ai_pb2_grpc.VisualAIServiceServicer):
         if len(frames) < 2:
             return True, 0, 1.0, "single_frame"
 
-        embeddings = [encoder.encode_single(f) for f in frames]
-        similarities = []
-
-        for i in range(len(embeddings) - 1):
-            sim = torch.nn.functional.cosine_similarity(
-                embeddings[i], embeddings[i+1], dim=-1
-            ).item()
-            similarities.append(sim)
+        # One forward for all frames, one kernel and one sync for all
+        # consecutive-pair similarities
+        with self._inflight:
+            embeddings = encoder.encode_batch(frames).reshape(len(frames), -1)
+        similarities = normalized_similarity(embeddings[:-1], embeddings[1:]).tolist()
 
         avg_sim = sum(similarities) / len(similarities)
         is_stable = all(s >= threshold for s in similarities[-2:]) if len(similarities) >= 2 else avg_sim >= threshold
@@ -329,6 +499,8 @@ class VisualAIServicer(visual_ai_pb2_grpc.VisualAIServiceServicer):
 
         return is_stable, stable_at, avg_sim, activity
 
+    @_releases_cached_memory
+    @torch.inference_mode()
     def FindByDescription(self, request, context):
         """Find element by text description using SigLIP"""
         start_time = time.time()
@@ -348,11 +520,12 @@ class VisualAIServicer(visual_ai_pb2_grpc.VisualAIServiceServicer):
             max_results = request.max_results or 5
 
             # Find matching regions
-            results = encoder.find_by_description(
-                screenshot,
-                request.description,
-                max_results=max_results
-            )
+            with self._inflight:
+                results = encoder.find_by_description(
+                    screenshot,
+                    request.description,
+                    max_results=max_results
+                )
 
             elapsed = time.time() - start_time
             self._record_inference_time(model_name, elapsed)
@@ -373,19 +546,14 @@ class VisualAIServicer(visual_ai_pb2_grpc.VisualAIServiceServicer):
             context.set_details(str(e))
             return visual_ai_pb2.FindByDescriptionResponse()
 
+    @_releases_cached_memory
+    @torch.inference_mode()
     def GenerateEmbedding(self, request, context):
         """Generate embedding for an image"""
         start_time = time.time()
 
         # Determine model
-        explicit_model = None
-        if request.model == visual_ai_pb2.MODEL_DINOV2:
-            explicit_model = "dinov2"
-        elif request.model == visual_ai_pb2.MODEL_VJEPA2:
-            explicit_model = "vjepa2"
-        elif request.model == visual_ai_pb2.MODEL_SIGLIP:
-            explicit_model = "siglip"
-
+        explicit_model = _EMBEDDING_MODELS.get(request.model)
         model_name, encoder = self._get_model(TaskType.EMBEDDING, explicit_model)
 
         if encoder is None:
@@ -396,10 +564,10 @@ class VisualAIServicer(visual_ai_pb2_grpc.VisualAIServiceServicer):
         try:
             # Load image
             image_source = request.image_data or request.image_uri
-            image = load_and_preprocess(image_source)
+            image = load_uint8(image_source)
 
             # Generate embedding
-            embedding = encoder.encode_single(image)
+            embedding = self._encode_batch(model_name, encoder, [image])
             if request.normalize:
                 embedding = torch.nn.functional.normalize(embedding, p=2, dim=-1)
 
@@ -419,16 +587,13 @@ class VisualAIServicer(visual_ai_pb2_grpc.VisualAIServiceServicer):
             context.set_details(str(e))
             return visual_ai_pb2.GenerateEmbeddingResponse()
 
+    @_releases_cached_memory
+    @torch.inference_mode()
     def BatchCompare(self, request, context):
         """Compare multiple frame pairs"""
         start_time = time.time()
 
-        explicit_model = None
-        if request.model == visual_ai_pb2.MODEL_DINOV2:
-            explicit_model = "dinov2"
-        elif request.model == visual_ai_pb2.MODEL_VJEPA2:
-            explicit_model = "vjepa2"
-
+        explicit_model = _COMPARE_MODELS.get(request.model)
         model_name, encoder = self._get_model(TaskType.COMPARE_SIMPLE, explicit_model)
 
         if encoder is None:
@@ -438,38 +603,44 @@ class VisualAIServicer(visual_ai_pb2_grpc.VisualAIServiceServicer):
 
         try:
             threshold = request.settings.similarity_threshold or 0.85
-            results = []
+            response = visual_ai_pb2.BatchCompareResponse()
             total_sim = 0.0
             matches = 0
 
-            for pair in request.pairs:
-                baseline_source = pair.baseline_data or pair.baseline_uri
-                actual_source = pair.actual_data or pair.actual_uri
-
-                baseline = load_and_preprocess(baseline_source)
-                actual = load_and_preprocess(actual_source)
-
-                similarity, is_similar, analysis = encoder.compare(baseline, actual, threshold)
-                total_sim += similarity
-                if is_similar:
-                    matches += 1
-
-                results.append(visual_ai_pb2.PairResult(
-                    pair_id=pair.pair_id,
-                    similarity_score=similarity,
-                    semantic_match=is_similar,
-                    analysis=analysis
-                ))
+            if request.pairs:
+                # Encode all 2N frames (baseline, actual interleaved) in one
+                # forward; baselines seen before come from the cache
+                sources = []
+                for pair in request.pairs:
+                    sources.append(pair.baseline_data or pair.baseline_uri)
+                    sources.append(pair.actual_data or pair.actual_uri)
+
+                embeddings = self._embed_sources(model_name, encoder, sources).view(len(request.pairs), 2, -1)
+                similarities = normalized_similarity(embeddings[:, 0], embeddings[:, 1]).tolist()
+                analyses = describe_similarities(similarities)
+
+                for pair, similarity, analysis in zip(request.pairs, similarities, analyses):
+                    is_similar = similarity >= threshold
+                    total_sim += similarity
+                    if is_similar:
+                        matches += 1
+
+                    # Appended in place; no standalone PairResult to copy in
+                    response.results.add(
+                        pair_id=pair.pair_id,
+                        similarity_score=similarity,
+                        semantic_match=is_similar,
+                        analysis=analysis
+                    )
 
             elapsed = time.time() - start_time
             self._record_inference_time(model_name, elapsed)
 
-            return visual_ai_pb2.BatchCompareResponse(
-                results=results,
-                average_similarity=total_sim / len(results) if results else 0.0,
-                matches=matches,
-                mismatches=len(results) - matches
-            )
+            count = len(response.results)
+            response.average_similarity = total_sim / count if count else 0.0
+            response.matches = matches
+            response.mismatches = count - matches
+            return response
 
         except Exception as e:
             logger.error(f"BatchCompare error: {e}")
@@ -477,6 +648,8 @@ class VisualAIServicer(visual_ai_pb2_grpc.VisualAIServiceServicer):
             context.set_details(str(e))
             return visual_ai_pb2.BatchCompareResponse()
 
+    @_releases_cached_memory
+    @torch.inference_mode()
     def AnalyzeChange(self, request, context):
         """Analyze visual change between frames"""
         start_time = time.time()
@@ -496,12 +669,14 @@ class VisualAIServicer(visual_ai_pb2_grpc.VisualAIServiceServicer):
             after = load_and_preprocess(after_source)
 
             if hasattr(encoder, 'analyze_change'):
-                description, changes, expected, confidence = encoder.analyze_change(
-                    before, after, request.action_performed
-                )
+                with self._inflight:
+                    description, changes, expected, confidence = encoder.analyze_change(
+                        before, after, request.action_performed
+                    )
             else:
                 # Fallback
-                similarity, _, analysis = encoder.compare(before, after)
+                with self._inflight:
+                    similarity, _, analysis = encoder.compare(before, after)
                 change_mag = 1 - similarity
                 description = analysis
                 changes = ["visual_change"] if change_mag > 0.05 else []
@@ -565,6 +740,28 @@ class VisualAIServicer(visual_ai_pb2_grpc.VisualAIServiceServicer):
         )
 
 
+def configure_torch_threads(config: dict):
+    """
+    Size torch's thread pools for the serving setup.
+
+    On CPU, each in-flight RPC runs its own forward, so by default the
+    cores are split between them instead of every forward spawning a
+    thread per core and oversubscribing the machine. On CUDA, input
+    shapes are fixed by utils.TRANSFORM, so cuDNN autotuning pays off.
+    """
+    if config["device"] == "cpu":
+        default_threads = max(1, (os.cpu_count() or 1) // config.get("max_inflight", 8))
+        torch.set_num_threads(int(os.environ.get("VISUAL_AI_INTRAOP", default_threads)))
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            # Only settable before any inter-op parallel work has started
+            pass
+        logger.info(f"CPU threads: intra-op={torch.get_num_threads()}, inter-op={torch.get_num_interop_threads()}")
+    elif config["device"] == "cuda":
+        torch.backends.cudnn.benchmark = True
+
+
 def serve(port: int = 50051):
     """Start the gRPC server"""
     # Parse config from environment
@@ -574,15 +771,40 @@ def serve(port: int = 50051):
     config = {
         "device": get_device(),
         "models": models,
+        "quantize": os.environ.get("VISUAL_AI_QUANTIZE", "false").lower() == "true",
+        "compile": os.environ.get("VISUAL_AI_COMPILE", "false").lower() in ("true", "1"),
+        "dinov2_weights": os.environ.get("DINOV2_WEIGHTS"),
+        "microbatch": os.environ.get("VISUAL_AI_MICROBATCH", "false").lower() == "true",
+        "microbatch_size": int(os.environ.get("VISUAL_AI_MICROBATCH_SIZE", "16")),
+        "microbatch_wait_ms": float(os.environ.get("VISUAL_AI_MICROBATCH_WAIT_MS", "4")),
+        "memory_fraction": float(os.environ.get("VISUAL_AI_MEM_FRAC", "0.9")),
+        "cache_release_mb": int(os.environ.get("VISUAL_AI_CACHE_RELEASE_MB", "2048")),
+        "max_inflight": int(os.environ.get("VISUAL_AI_MAX_INFLIGHT", "8")),
+        "embedding_cache_size": int(os.environ.get("VISUAL_AI_EMBEDDING_CACHE_SIZE", "4096")),
+        "backend": os.environ.get("VISUAL_AI_BACKEND", "torch").lower(),
+        "dinov2_trt_engine": os.environ.get("DINOV2_TRT_ENGINE", "dinov2.trt"),
+        "cuda_graphs": os.environ.get("VISUAL_AI_CUDA_GRAPHS", "false").lower() == "true",
+        "siglip_load_mode": os.environ.get("SIGLIP_LOAD_MODE", "both"),
+        "vjepa2_bucket_clips": os.environ.get("VJEPA2_BUCKET_CLIPS", "false").lower() == "true",
     }
 
     logger.info(f"Starting Visual AI service with config: {config}")
+    configure_torch_threads(config)
+
+    # Workers mostly wait on MinIO and image decoding; model work is
+    # bounded separately by VISUAL_AI_MAX_INFLIGHT
+    max_workers = int(os.environ.get("VISUAL_AI_GRPC_WORKERS", min(32, 4 * (os.cpu_count() or 1))))
 
     server = grpc.server(
-        futures.ThreadPoolExecutor(max_workers=4),
+        futures.ThreadPoolExecutor(max_workers=max_workers),
         options=[
             ('grpc.max_send_message_length', 100 * 1024 * 1024),  # 100MB
             ('grpc.max_receive_message_length', 100 * 1024 * 1024),
+            ('grpc.so_reuseport', 1),  # allow several server processes on one port
+            ('grpc.max_concurrent_streams', 256),
+            ('grpc.keepalive_time_ms', 10000),
+            ('grpc.keepalive_timeout_ms', 5000),
+            ('grpc.http2.min_ping_interval_without_data_ms', 5000),
         ]
     )
 
@@ -594,7 +816,7 @@ def serve(port: int = 50051):
     server.start()
 
     logger.info(f"Visual AI service started on port {port}")
-    logger.info(f"Device: {config['device']}")
+    logger.info(f"Device: {config['device']}, gRPC workers: {max_workers}")
     logger.info(f"Models: {config['models']}")
 
     try:
@@ -3,16 +3,23 @@ Utility functions for Visual AI service.
 """
 
 import io
+import hashlib
+import threading
 import torch
 import torchvision.transforms as T
+import torchvision.transforms.functional as TF
+from torchvision.io import decode_image, ImageReadMode
 from PIL import Image
-from typing import List, Union, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Union, Optional
 import logging
 import os
 
 # MinIO/S3 imports
 try:
     from minio import Minio
+    import urllib3
     HAS_MINIO = True
 except ImportError:
     HAS_MINIO = False
@@ -44,8 +51,18 @@ def get_minio_client() -> Optional["Minio"]:
         endpoint = endpoint[8:]
         secure = True
 
+    # The default pool keeps 10 connections per host, fewer than the frame
+    # loader pool fetches concurrently
+    http_client = urllib3.PoolManager(
+        num_pools=4,
+        maxsize=64,
+        cert_reqs="CERT_REQUIRED" if secure else "CERT_NONE",
+        retries=urllib3.Retry(total=3, backoff_factor=0.1, status_forcelist=[500, 502, 503, 504]),
+        timeout=urllib3.Timeout(connect=2.0, read=10.0),
+    )
+
     try:
-        client = Minio(endpoint, access_key, secret_key, secure=secure)
+        client = Minio(endpoint, access_key, secret_key, secure=secure, http_client=http_client)
         return client
     except Exception as e:
         logger.warning(f"Failed to create MinIO client: {e}")
@@ -53,28 +70,32 @@ def get_minio_client() -> Optional["Minio"]:
 
 
 _minio_client = None
+_minio_client_lock = threading.Lock()
 
 
-def load_image(source: Union[bytes, str]) -> Image.Image:
+def read_image_bytes(source: Union[bytes, str]) -> bytes:
     """
-    Load image from bytes or URI.
+    Read the encoded image bytes for a source.
 
     Args:
-        source: Either raw bytes or a MinIO URI (s3://bucket/key)
+        source: Either raw bytes, a MinIO URI (s3://bucket/key) or a local path
 
     Returns:
-        PIL Image
+        Encoded (PNG/JPEG/...) image bytes
     """
     global _minio_client
 
     if isinstance(source, bytes):
-        return Image.open(io.BytesIO(source)).convert("RGB")
+        return source
 
     if isinstance(source, str):
         # Check if it's a MinIO/S3 URI
         if source.startswith("s3://") or source.startswith("minio://"):
             if _minio_client is None:
-                _minio_client = get_minio_client()
+                # Frames are loaded from a thread pool; build one shared client
+                with _minio_client_lock:
+                    if _minio_client is None:
+                        _minio_client = get_minio_client()
 
             if _minio_client is None:
                 raise RuntimeError("MinIO client not available")
@@ -84,24 +105,55 @@ def load_image(source: Union[bytes, str]) -> Image.Image:
             bucket = parts[0]
             key = parts[1] if len(parts) > 1 else ""
 
+            response = None
             try:
                 response = _minio_client.get_object(bucket, key)
-                data = response.read()
-                response.close()
-                response.release_conn()
-                return Image.open(io.BytesIO(data)).convert("RGB")
+                return response.read()
             except Exception as e:
                 raise RuntimeError(f"Failed to load image from MinIO: {e}")
+            finally:
+                # Always hand the connection back to the pool
+                if response is not None:
+                    response.close()
+                    response.release_conn()
 
         # Local file path
         if os.path.exists(source):
-            return Image.open(source).convert("RGB")
+            with open(source, "rb") as f:
+                return f.read()
 
         raise ValueError(f"Unknown image source: {source}")
 
     raise TypeError(f"Expected bytes or str, got {type(source)}")
 
 
+def load_image(source: Union[bytes, str]) -> Image.Image:
+    """
+    Load image from bytes or URI.
+
+    Args:
+        source: Either raw bytes or a MinIO URI (s3://bucket/key)
+
+    Returns:
+        PIL Image
+    """
+    return Image.open(io.BytesIO(read_image_bytes(source))).convert("RGB")
+
+
+def decode_uint8(data: bytes) -> torch.Tensor:
+    """
+    Decode image bytes to a uint8 RGB tensor of shape (3, H, W).
+
+    Uses torchvision's native decoders (libjpeg-turbo/libpng), skipping the
+    PIL image and its conversion copy; formats they can't handle go
+    through PIL.
+    """
+    try:
+        return decode_image(torch.frombuffer(bytearray(data), dtype=torch.uint8), mode=ImageReadMode.RGB)
+    except RuntimeError:
+        return TF.pil_to_tensor(Image.open(io.BytesIO(data)).convert("RGB"))
+
+
 def preprocess_frame(image: Image.Image) -> torch.Tensor:
     """
     Preprocess a single image for model input.
@@ -128,20 +180,110 @@ def preprocess_frames(images: List[Image.Image]) -> List[torch.Tensor]:
     return [preprocess_frame(img) for img in images]
 
 
+# LRU of loaded frames keyed by URI or content hash; test baselines are
+# compared against many candidates. Entries are ~1.7 MB (3x384x384 FP32)
+# or ~0.4 MB (uint8).
+IMAGE_CACHE_SIZE = int(os.environ.get("VISUAL_AI_IMAGE_CACHE_SIZE", "512"))
+_image_cache: "OrderedDict[tuple, torch.Tensor]" = OrderedDict()
+_image_cache_lock = threading.Lock()
+
+
+def source_key(source: Union[bytes, str]) -> tuple:
+    """Hashable identity of an image source: the URI, or a digest of inline bytes"""
+    if isinstance(source, bytes):
+        return ("bytes", hashlib.blake2b(source, digest_size=16).digest())
+    return ("uri", source)
+
+
+def _load_cached(source: Union[bytes, str], kind: str, load: Callable[[Union[bytes, str]], torch.Tensor]) -> torch.Tensor:
+    if IMAGE_CACHE_SIZE <= 0:
+        return load(source)
+
+    key = (kind, *source_key(source))
+    with _image_cache_lock:
+        frame = _image_cache.get(key)
+        if frame is not None:
+            _image_cache.move_to_end(key)
+            return frame
+
+    frame = load(source)
+
+    with _image_cache_lock:
+        _image_cache[key] = frame
+        if len(_image_cache) > IMAGE_CACHE_SIZE:
+            _image_cache.popitem(last=False)
+    return frame
+
+
 def load_and_preprocess(source: Union[bytes, str]) -> torch.Tensor:
-    """Load and preprocess an image in one step"""
-    image = load_image(source)
-    return preprocess_frame(image)
+    """
+    Load and preprocess an image in one step.
+
+    Results are cached; the returned tensor is shared and must not be
+    modified in place.
+    """
+    return _load_cached(source, "float", lambda s: preprocess_frame(load_image(s)))
+
+
+def load_uint8(source: Union[bytes, str], size: int = 384) -> torch.Tensor:
+    """
+    Load an image as a resized uint8 tensor of shape (3, size, size).
+
+    Bilinear antialiased resize like TRANSFORM, run on the uint8 tensor;
+    normalization is left to the encoders, which do it on device, so the
+    upload is a quarter of an FP32 frame. Results are cached and shared
+    like load_and_preprocess.
+    """
+    def load(s):
+        image = decode_uint8(read_image_bytes(s))
+        return TF.resize(image, [size, size], interpolation=T.InterpolationMode.BILINEAR, antialias=True)
+    return _load_cached(source, f"uint8-{size}", load)
+
+
+# TRANSFORM's normalization, for frames already resized by load_uint8
+_MEAN = torch.tensor([0.485, 0.456, 0.406]).view(3, 1, 1)
+_STD = torch.tensor([0.229, 0.224, 0.225]).view(3, 1, 1)
+
+
+def normalize_uint8(frame: torch.Tensor) -> torch.Tensor:
+    """
+    Normalize a uint8 frame from load_uint8 on the host, like TRANSFORM.
+
+    Lets callers reuse the cached uint8 frame instead of loading the
+    source again through load_and_preprocess.
+    """
+    return frame.float().div_(255).sub_(_MEAN).div_(_STD)
+
+
+# Fetch/decode/resize pool shared by all requests. MinIO GETs are I/O-bound
+# and PIL releases the GIL while decoding and resizing.
+_load_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="frame-load")
 
 
 def load_and_preprocess_many(sources: List[Union[bytes, str]]) -> List[torch.Tensor]:
-    """Load and preprocess multiple images"""
-    return [load_and_preprocess(s) for s in sources]
+    """Load and preprocess multiple images in parallel, preserving order"""
+    if len(sources) <= 1:
+        return [load_and_preprocess(s) for s in sources]
+    return list(_load_pool.map(load_and_preprocess, sources))
+
+
+def load_uint8_many(sources: List[Union[bytes, str]]) -> List[torch.Tensor]:
+    """Load multiple images as uint8 frames in parallel, preserving order"""
+    if len(sources) <= 1:
+        return [load_uint8(s) for s in sources]
+    return list(_load_pool.map(load_uint8, sources))
 
 
 def tensor_to_bytes(tensor: torch.Tensor) -> bytes:
-    """Convert embedding tensor to bytes for gRPC transmission"""
-    return tensor.cpu().numpy().tobytes()
+    """
+    Convert embedding tensor to FP32 bytes for gRPC transmission.
+
+    The wire format stays FP32 (clients size it as embedding_dim * 4). The
+    device->host move and any cast happen in one copy; tobytes() is the
+    only other copy, which protobuf's bytes field requires.
+    """
+    host = tensor.detach().to("cpu", torch.float32).contiguous()
+    return host.numpy().tobytes()
 
 
 def bytes_to_tensor(data: bytes, shape: tuple) -> torch.Tensor:
@@ -170,31 +312,28 @@ def calculate_changed_regions(
     if frame2.dim() == 4:
         frame2 = frame2.squeeze(0)
 
-    _, H, W = frame1.shape
+    C, H, W = frame1.shape
     patch_h = H // grid_size
     patch_w = W // grid_size
 
-    changes = []
+    # Per-cell mean absolute difference for the whole grid in one reduction,
+    # cropping any remainder pixels that don't fill a cell
+    diff = (frame1 - frame2).abs()[:, :grid_size * patch_h, :grid_size * patch_w]
+    grid = diff.reshape(C, grid_size, patch_h, grid_size, patch_w).mean(dim=(0, 2, 4))
 
-    for i in range(grid_size):
-        for j in range(grid_size):
-            y_start = i * patch_h
-            y_end = (i + 1) * patch_h
-            x_start = j * patch_w
-            x_end = (j + 1) * patch_w
+    # Single device->host transfer, then scan the grid in row-major order
+    scores = grid.cpu().tolist()
 
-            patch1 = frame1[:, y_start:y_end, x_start:x_end]
-            patch2 = frame2[:, y_start:y_end, x_start:x_end]
-
-            diff = (patch1 - patch2).abs().mean().item()
-
-            if diff > threshold:
+    changes = []
+    for i, row in enumerate(scores):
+        for j, score in enumerate(row):
+            if score > threshold:
                 changes.append({
-                    "x": x_start,
-                    "y": y_start,
+                    "x": j * patch_w,
+                    "y": i * patch_h,
                     "width": patch_w,
                     "height": patch_h,
-                    "significance": min(diff / threshold, 1.0),
+                    "significance": min(score / threshold, 1.0),
                 })
 
     return changes
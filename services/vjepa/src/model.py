@@ -7,6 +7,7 @@ to learn rich visual representations without labels.
 
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 from typing import Optional
 import logging
 import os
@@ -22,19 +23,28 @@ class VJEPAModel(nn.Module):
     self-supervised learning principles with V-JEPA.
     """
 
-    def __init__(self, encoder: nn.Module, embed_dim: int = 1024):
+    def __init__(self, encoder: nn.Module, embed_dim: int = 1024, input_dim: Optional[int] = None):
         super().__init__()
         self.encoder = encoder
         self.embed_dim = embed_dim
-        self._input_dim = None
+
+        # Encoder output width: HF models report it in their config,
+        # otherwise it is assumed to match embed_dim
+        if input_dim is None:
+            input_dim = getattr(getattr(encoder, "config", None), "hidden_size", embed_dim)
+        self._input_dim = input_dim
 
         # Projection head for normalized embeddings
-        self.projection = nn.Sequential(
-            nn.Linear(embed_dim, embed_dim),
-            nn.GELU(),
-            nn.Linear(embed_dim, embed_dim)
-        )
-        self._resized_projection = False
+        self.projection = Projection(input_dim, embed_dim)
+
+    @staticmethod
+    def _load_encoder(model_id: str) -> nn.Module:
+        """Load a HuggingFace encoder on CPU in FP32, frozen for inference."""
+        from transformers import AutoModel
+        encoder = AutoModel.from_pretrained(model_id).eval()
+        for p in encoder.parameters():
+            p.requires_grad_(False)
+        return encoder
 
     @classmethod
     def from_pretrained(cls, model_path: str) -> "VJEPAModel":
@@ -58,8 +68,7 @@ class VJEPAModel(nn.Module):
 
         # Try DINOv2 (best available alternative)
         try:
-            from transformers import AutoModel
-            encoder = AutoModel.from_pretrained("facebook/dinov2-base")
+            encoder = cls._load_encoder("facebook/dinov2-base")
             embed_dim = 768  # DINOv2 base embedding dim
             logger.info("Loaded DINOv2-base as visual encoder")
             return cls(encoder, embed_dim)
@@ -68,8 +77,7 @@ class VJEPAModel(nn.Module):
 
         # Try ViT (fallback)
         try:
-            from transformers import AutoModel
-            encoder = AutoModel.from_pretrained("google/vit-base-patch16-224")
+            encoder = cls._load_encoder("google/vit-base-patch16-224")
             embed_dim = 768
             logger.info("Loaded ViT-Base as visual encoder")
             return cls(encoder, embed_dim)
@@ -78,7 +86,8 @@ class VJEPAModel(nn.Module):
 
         # Final fallback: simple CNN encoder
         logger.info("Using lightweight CNN encoder as fallback")
-        encoder = SimpleCNNEncoder()
+        encoder = SimpleCNNEncoder().eval()
+        encoder.fuse()
         return cls(encoder, 512)
 
     def encode(self, images: torch.Tensor) -> torch.Tensor:
@@ -108,18 +117,6 @@ class VJEPAModel(nn.Module):
         else:
             embeddings = outputs
 
-        # Handle dimension mismatch
-        if embeddings.shape[-1] != self.embed_dim and not self._resized_projection:
-            self._input_dim = embeddings.shape[-1]
-            self.projection = nn.Sequential(
-                nn.Linear(self._input_dim, self.embed_dim),
-                nn.GELU(),
-                nn.Linear(self.embed_dim, self.embed_dim)
-            ).to(embeddings.device)
-            if embeddings.dtype == torch.float16:
-                self.projection = self.projection.half()
-            self._resized_projection = True
-
         embeddings = self.projection(embeddings)
 
         return embeddings
@@ -128,6 +125,23 @@ class VJEPAModel(nn.Module):
         return self.encode(images)
 
 
+class Projection(nn.Module):
+    """
+    Linear -> GELU -> Linear projection head.
+
+    Written as one functional chain rather than an nn.Sequential so
+    torch.compile sees a single fusable region.
+    """
+
+    def __init__(self, input_dim: int, embed_dim: int):
+        super().__init__()
+        self.fc1 = nn.Linear(input_dim, embed_dim)
+        self.fc2 = nn.Linear(embed_dim, embed_dim)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return F.linear(F.gelu(F.linear(x, self.fc1.weight, self.fc1.bias)), self.fc2.weight, self.fc2.bias)
+
+
 class SimpleCNNEncoder(nn.Module):
     """Simple CNN encoder as fallback when no pretrained models available."""
 
@@ -160,6 +174,21 @@ class SimpleCNNEncoder(nn.Module):
         )
         self.fc = nn.Linear(512, output_dim)
 
+    def fuse(self) -> "SimpleCNNEncoder":
+        """
+        Fold each BatchNorm into its conv and fuse the ReLU, so every block
+        runs as a single conv kernel. Inference only: call in eval mode.
+        """
+        from torch.ao.quantization import fuse_modules
+
+        # Conv/BN/ReLU indices of the four blocks in conv_layers
+        fuse_modules(
+            self.conv_layers,
+            [["0", "1", "2"], ["4", "5", "6"], ["8", "9", "10"], ["12", "13", "14"]],
+            inplace=True,
+        )
+        return self
+
     def forward(self, x: torch.Tensor) -> torch.Tensor:
         x = self.conv_layers(x)
         x = x.view(x.size(0), -1)
@@ -8,24 +8,29 @@ Provides visual understanding capabilities for:
 - Screenshot comparison
 """
 
+import asyncio
 import grpc
 from concurrent import futures
 import logging
 import torch
 import torch.nn.functional as F
 from PIL import Image
-import io
+import hashlib
+import itertools
 import numpy as np
-from typing import List, Optional
+from collections import OrderedDict, deque
+from typing import List, Optional, Tuple
 import time
 import os
 import sys
+import queue
+import threading
 
 # Add proto directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'proto'))
 
 from model import VJEPAModel
-from utils import download_image, preprocess_image, find_changed_regions
+from utils import decode_image, download_image, preprocess_image, preprocess_images, find_changed_region_array, regions_to_dicts
 
 # Import generated protobuf modules
 try:
@@ -51,11 +56,37 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Batch sizes the compiled encoder is specialized for; larger batches run in
+# chunks of the largest, smaller ones are padded up to the next size
+COMPILED_BATCH_SIZES = (1, 2, 4, 8, 16)
+
+# Batches the inference thread keeps queued on the GPU at once, so one
+# batch's upload overlaps the previous one's forward pass
+PIPELINE_DEPTH = 2
+
+# Below this similarity the whole frame is reported as changed instead of
+# running the pixel diff; region analysis is for the ambiguous band
+FULL_FRAME_CHANGE_SIMILARITY = 0.3
+
+# Side of the square frames the pixel diff runs on
+DIFF_SIZE = 512
+
 
 class VJEPAServicer(vjepa_pb2_grpc.VJEPAServiceServicer):
     """V-JEPA 2 Visual Validation Service Implementation."""
 
-    def __init__(self, model_path: str, device: str = "cuda"):
+    def __init__(
+        self,
+        model_path: str,
+        device: str = "cuda",
+        compile_model: bool = False,
+        microbatch_size: int = 0,
+        microbatch_wait_ms: float = 5.0,
+        cuda_graphs: bool = True,
+        embedding_cache_size: int = 4096,
+        max_workers: int = 4,
+        gpu_preprocess: bool = False
+    ):
         self.device = torch.device(device if torch.cuda.is_available() else "cpu")
         logger.info(f"Initializing V-JEPA service on {self.device}")
 
@@ -64,121 +95,462 @@ class VJEPAServicer(vjepa_pb2_grpc.VJEPAServiceServicer):
         self.model.to(self.device)
         self.model.eval()
 
-        # Use FP16 for memory efficiency on GPU
+        # Reduced precision on GPU: BF16 keeps FP32's exponent range (no
+        # overflow in attention softmax or LayerNorm), FP16 on older GPUs
+        self.dtype = torch.float32
         if self.device.type == "cuda":
-            self.model = self.model.half()
-            logger.info("Using FP16 precision for GPU inference")
+            self.dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+            self.model = self.model.to(dtype=self.dtype)
+            logger.info(f"Using {self.dtype} precision for GPU inference")
+
+            # NHWC lets cuDNN pick tensor-core kernels for the conv and
+            # patch-embedding layers without internal layout transposes
+            self.model = self.model.to(memory_format=torch.channels_last)
+
+        # Compile the backbone with static shapes; warm-up below builds one
+        # graph per entry in COMPILED_BATCH_SIZES
+        self.compiled = compile_model
+        if compile_model:
+            torch._dynamo.config.cache_size_limit = 32
+            self.model.encoder = torch.compile(self.model.encoder, mode="reduce-overhead", dynamic=False)
+            self.model.projection = torch.compile(self.model.projection, dynamic=False)
+            logger.info("Compiled encoder with torch.compile")
+
+        # Optionally resize and normalize on the GPU instead of the CPU pool
+        self.gpu_preprocess = gpu_preprocess and self.device.type == "cuda"
+        # Per request thread CUDA stream for GPU preprocessing
+        self._preprocess_streams = threading.local()
+
+        # Image decoding and preprocessing run here rather than on the gRPC
+        # thread; PIL releases the GIL while decoding and resizing
+        self._preproc_pool = futures.ThreadPoolExecutor(
+            max_workers=os.cpu_count(), thread_name_prefix="preprocess"
+        )
+
+        # Request handlers run here, off the asyncio event loop that does
+        # gRPC I/O and (de)serialization
+        self._request_pool = futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="request"
+        )
 
-        # Warm up the model
-        self._warmup()
+        # All model execution happens on one dedicated thread with its own
+        # CUDA stream, so request threads never contend on the GPU. Requests
+        # queue their preprocessed batches for it; with micro-batching,
+        # batches queued within the wait window are encoded together.
+        self.microbatch_size = microbatch_size
+        self.microbatch_wait_ms = microbatch_wait_ms
+        self._batch_queue: queue.Queue = queue.Queue()
+        self._graph: Optional[torch.cuda.CUDAGraph] = None
+        ready = futures.Future()
+        threading.Thread(
+            target=self._inference_thread, args=(ready, cuda_graphs), name="inference", daemon=True
+        ).start()
+        ready.result()
+        if microbatch_size > 1:
+            logger.info(f"Micro-batching enabled: max_batch={microbatch_size}, max_wait={microbatch_wait_ms}ms")
+
+        # LRU of baseline embeddings keyed by content hash or URI; baselines
+        # are compared against many candidates and rarely change.
+        self.embedding_cache_size = embedding_cache_size
+        self._emb_cache: "OrderedDict[tuple, torch.Tensor]" = OrderedDict()
+        self._emb_cache_lock = threading.Lock()
 
         # Metrics tracking
-        self.inference_times: List[float] = []
+        self.inference_times: "deque[float]" = deque(maxlen=1000)
+        self._request_counter = itertools.count(1)
         self.request_count = 0
 
         logger.info("V-JEPA service initialized successfully")
 
+    def _inference_thread(self, ready: futures.Future, cuda_graphs: bool):
+        """Set up the model on the inference thread, then serve queued batches."""
+        try:
+            if self.device.type == "cuda":
+                # Compute runs on the thread's stream; uploads and downloads
+                # get their own so consecutive batches overlap
+                torch.cuda.set_stream(torch.cuda.Stream(self.device))
+                self._copy_in_stream = torch.cuda.Stream(self.device)
+                self._copy_out_stream = torch.cuda.Stream(self.device)
+
+            # Warm up the model
+            self._warmup()
+
+            # Single-image requests replay a captured CUDA graph instead of
+            # launching each kernel. Skipped when compiled: reduce-overhead
+            # mode already runs on CUDA graphs.
+            if cuda_graphs and self.device.type == "cuda" and not self.compiled:
+                self._capture_graph()
+        except Exception as e:
+            ready.set_exception(e)
+            return
+
+        ready.set_result(None)
+        self._batch_worker()
+
     def _warmup(self):
-        """Warm up the model with a dummy inference."""
+        """Warm up the model with dummy inferences for each served batch size."""
         logger.info("Warming up model...")
-        dummy = torch.randn(1, 3, 224, 224).to(self.device)
-        if self.device.type == "cuda":
-            dummy = dummy.half()
-        with torch.no_grad():
-            _ = self.model.encode(dummy)
+        batch_sizes = COMPILED_BATCH_SIZES if self.compiled else (1,)
+        for batch_size in batch_sizes:
+            dummy = self._to_device(torch.randn(batch_size, 3, 224, 224))
+            with torch.inference_mode(), self._autocast():
+                # reduce-overhead records its CUDA graph on the second call
+                for _ in range(2 if self.compiled else 1):
+                    _ = self.model.encode(dummy)
         if self.device.type == "cuda":
             torch.cuda.synchronize()
         logger.info("Model warmup complete")
 
+    def _capture_graph(self):
+        """Capture the single-image forward into a CUDA graph with static input/output."""
+        static_in = self._to_device(torch.zeros(1, 3, 224, 224))
+
+        # Let the allocator and cuDNN settle on a side stream before capture
+        stream = torch.cuda.Stream()
+        stream.wait_stream(torch.cuda.current_stream())
+        with torch.cuda.stream(stream), torch.inference_mode(), self._autocast():
+            for _ in range(3):
+                self.model.encode(static_in)
+        torch.cuda.current_stream().wait_stream(stream)
+
+        graph = torch.cuda.CUDAGraph()
+        with torch.inference_mode(), self._autocast(cache_enabled=False), torch.cuda.graph(graph):
+            static_out = self.model.encode(static_in)
+
+        self._static_in, self._static_out, self._graph = static_in, static_out, graph
+        logger.info("Captured CUDA graph for single-image inference")
+
+    def _to_device(self, batch: torch.Tensor) -> torch.Tensor:
+        """Move a batch to the device in the model's dtype and memory format."""
+        if self.device.type != "cuda":
+            return batch.to(self.device, dtype=self.dtype)
+        if batch.is_cuda:
+            # Preprocessed on a request thread's stream; keep its memory
+            # from being reused until this stream has read it
+            batch.record_stream(torch.cuda.current_stream())
+            return batch.to(dtype=self.dtype, memory_format=torch.channels_last)
+
+        # Upload from page-locked memory so the copy is an async DMA rather
+        # than a staged, blocking one; pin_memory() reuses blocks from
+        # PyTorch's caching host allocator across requests
+        batch = batch.pin_memory().to(self.device, non_blocking=True)
+        return batch.to(dtype=self.dtype, memory_format=torch.channels_last)
+
+    def _autocast(self, cache_enabled: bool = True):
+        """Autocast to the inference dtype on GPU; a no-op on CPU."""
+        return torch.autocast(
+            device_type=self.device.type,
+            dtype=self.dtype,
+            enabled=self.device.type == "cuda",
+            cache_enabled=cache_enabled
+        )
+
     def _load_image(self, data: bytes = None, uri: str = None) -> Image.Image:
         """Load image from bytes or URI."""
         if data and len(data) > 0:
-            return Image.open(io.BytesIO(data)).convert("RGB")
+            return decode_image(data)
         elif uri and len(uri) > 0:
             return download_image(uri)
         else:
             raise ValueError("Either data or uri must be provided")
 
-    def _get_embedding(self, image: Image.Image) -> torch.Tensor:
-        """Get embedding for an image."""
-        tensor = preprocess_image(image).to(self.device)
-        if self.device.type == "cuda":
-            tensor = tensor.half()
+    def _load_images(self, sources: List[Tuple[Optional[bytes], Optional[str]]]) -> List[Image.Image]:
+        """Load (data, uri) sources in parallel, preserving order."""
+        if len(sources) <= 1:
+            return [self._load_image(data, uri) for data, uri in sources]
+        return list(self._preproc_pool.map(lambda source: self._load_image(*source), sources))
 
-        with torch.no_grad():
-            embedding = self.model.encode(tensor)
+    def _get_raw_embedding(self, image: Image.Image) -> torch.Tensor:
+        """Get the unnormalized embedding for an image."""
+        return self._compute_embeddings([image])
 
-        return F.normalize(embedding, p=2, dim=-1)
+    @staticmethod
+    def _source_key(data: Optional[bytes], uri: Optional[str]) -> tuple:
+        """Embedding cache key: a digest of inline bytes, or the URI."""
+        if data:
+            return ("bytes", hashlib.blake2b(data, digest_size=16).digest())
+        return ("uri", uri)
 
-    def CompareFrames(self, request, context):
+    def _get_embeddings(
+        self,
+        images: List[Image.Image],
+        cache_keys: Optional[List[Optional[tuple]]] = None
+    ) -> torch.Tensor:
+        """
+        Get L2-normalized host (CPU, FP32) embeddings for several images
+        with a single forward pass.
+
+        Images with a cache key are looked up in the embedding cache first;
+        only the misses are encoded, and keyed misses are cached.
+        """
+        if not cache_keys or self.embedding_cache_size <= 0:
+            return F.normalize(self._compute_embeddings(images), p=2, dim=-1)
+
+        embeddings: List[Optional[torch.Tensor]] = [None] * len(images)
+        with self._emb_cache_lock:
+            for i, key in enumerate(cache_keys):
+                if key is not None and key in self._emb_cache:
+                    self._emb_cache.move_to_end(key)
+                    embeddings[i] = self._emb_cache[key]
+
+        misses = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if misses:
+            computed = F.normalize(self._compute_embeddings([images[i] for i in misses]), p=2, dim=-1)
+            with self._emb_cache_lock:
+                for i, embedding in zip(misses, computed):
+                    embeddings[i] = embedding
+                    if cache_keys[i] is not None:
+                        # Clone so the entry doesn't pin the whole batch
+                        self._emb_cache[cache_keys[i]] = embedding.clone()
+                        if len(self._emb_cache) > self.embedding_cache_size:
+                            self._emb_cache.popitem(last=False)
+
+        return torch.stack(embeddings)
+
+    def _compute_embeddings(self, images: List[Image.Image]) -> torch.Tensor:
+        """Preprocess images and encode them to raw host embeddings on the inference thread."""
+        if self.gpu_preprocess:
+            # Each request thread uploads and resizes on its own stream, so
+            # concurrent requests' copies overlap each other and inference
+            stream = getattr(self._preprocess_streams, "stream", None)
+            if stream is None:
+                stream = self._preprocess_streams.stream = torch.cuda.Stream(self.device)
+            with torch.cuda.stream(stream):
+                batch = preprocess_images(images, self.device)
+            # The inference thread reads the batch from its own streams
+            stream.synchronize()
+        elif len(images) > 1:
+            batch = torch.stack(list(self._preproc_pool.map(preprocess_image, images)))
+        else:
+            batch = preprocess_image(images[0]).unsqueeze(0)
+
+        future = futures.Future()
+        self._batch_queue.put((batch, future))
+        return future.result()
+
+    def _chunks(self, batch: torch.Tensor) -> List[torch.Tensor]:
+        """Split a batch into the chunks encoded per forward pass."""
+        if not self.compiled:
+            return [batch]
+
+        # Stay on the compiled shapes instead of recompiling per batch size
+        return list(batch.split(COMPILED_BATCH_SIZES[-1]))
+
+    def _upload(self, chunk: torch.Tensor) -> torch.Tensor:
+        """Move a chunk to the device, padding it to a compiled batch size when compiled."""
+        n = chunk.shape[0]
+        if self.compiled:
+            size = next(s for s in COMPILED_BATCH_SIZES if s >= n)
+            if size > n:
+                chunk = torch.cat([chunk, chunk.new_zeros(size - n, *chunk.shape[1:])])
+        return self._to_device(chunk)
+
+    def _forward(self, batch: torch.Tensor, n: int) -> torch.Tensor:
+        """Encode an uploaded batch, returning the first n (unpadded) embeddings."""
+        if n == 1 and self._graph is not None:
+            with torch.inference_mode():
+                self._static_in.copy_(batch)
+                self._graph.replay()
+                embeddings = self._static_out.clone()
+        else:
+            with torch.inference_mode(), self._autocast():
+                embeddings = self.model.encode(batch)[:n]
+
+        # Return FP32: similarities near the 0.85-0.98 thresholds need more
+        # resolution than BF16's 8-bit mantissa, and the wire format is
+        # FP32 anyway
+        return embeddings.float()
+
+    def _launch(self, batch: torch.Tensor) -> Tuple[torch.Tensor, Optional[torch.cuda.Event]]:
+        """
+        Encode a preprocessed batch to host embeddings.
+
+        On GPU the upload, forward and download are only queued, on the
+        copy-in, compute (current) and copy-out streams, so the next
+        batch's upload overlaps this one's forward. The host tensor is
+        valid once the returned event completes.
+        """
+        if self.device.type != "cuda":
+            return torch.cat([self._forward(self._upload(chunk), chunk.shape[0]) for chunk in self._chunks(batch)]), None
+
+        compute_stream = torch.cuda.current_stream()
+        outputs = []
+        for chunk in self._chunks(batch):
+            with torch.cuda.stream(self._copy_in_stream):
+                uploaded = self._upload(chunk)
+            compute_stream.wait_stream(self._copy_in_stream)
+            uploaded.record_stream(compute_stream)
+            outputs.append(self._forward(uploaded, chunk.shape[0]))
+        embeddings = torch.cat(outputs)
+
+        self._copy_out_stream.wait_stream(compute_stream)
+        with torch.cuda.stream(self._copy_out_stream):
+            embeddings.record_stream(self._copy_out_stream)
+            host = embeddings.to("cpu", non_blocking=True)
+            done = torch.cuda.Event()
+            done.record()
+        return host, done
+
+    @staticmethod
+    def _complete(pending: list, host: torch.Tensor, done: Optional[torch.cuda.Event]):
+        """Wait for a launched batch and hand each caller its embeddings."""
+        try:
+            if done is not None:
+                done.synchronize()
+        except Exception as e:
+            for _, future in pending:
+                future.set_exception(e)
+            return
+
+        sizes = [batch.shape[0] for batch, _ in pending]
+        for (_, future), chunk in zip(pending, host.split(sizes)):
+            future.set_result(chunk)
+
+    def _batch_worker(self):
+        """
+        Encode queued batches on the inference thread. With micro-batching,
+        batches queued within microbatch_wait_ms share one forward pass.
+
+        Up to PIPELINE_DEPTH batches are in flight on the GPU at once; the
+        oldest is completed when the limit is reached or the queue drains.
+        """
+        inflight = deque()
+        while True:
+            if inflight and (len(inflight) >= PIPELINE_DEPTH or self._batch_queue.empty()):
+                self._complete(*inflight.popleft())
+                continue
+
+            pending = [self._batch_queue.get()]
+            size = pending[0][0].shape[0]
+            deadline = time.monotonic() + self.microbatch_wait_ms / 1000
+
+            while size < self.microbatch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._batch_queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                pending.append(item)
+                size += item[0].shape[0]
+
+            try:
+                host, done = self._launch(torch.cat([batch for batch, _ in pending]))
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            inflight.append((pending, host, done))
+
+    async def _run(self, handler, request, context):
+        """Run a blocking request handler on the request pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._request_pool, handler, request, context)
+
+    @staticmethod
+    def _diff_array(image: Image.Image) -> np.ndarray:
+        """Resize a frame for the pixel diff; bilinear is plenty for change detection."""
+        return np.asarray(image.resize((DIFF_SIZE, DIFF_SIZE), Image.BILINEAR))
+
+    @staticmethod
+    def _similarity_threshold(settings) -> float:
+        """Similarity threshold from request settings, defaulting to 0.85."""
+        if settings and settings.similarity_threshold > 0:
+            return settings.similarity_threshold
+        return 0.85
+
+    def _build_compare_response(
+        self,
+        baseline_img: Image.Image,
+        actual_img: Image.Image,
+        baseline_emb: torch.Tensor,
+        actual_emb: torch.Tensor,
+        similarity: float,
+        threshold: float,
+        ctx: str
+    ):
+        """Build a CompareFramesResponse from a pair's host (CPU, FP32) embeddings and similarity."""
+        semantic_match = similarity >= threshold
+
+        # Find changed regions if not matching
+        changed_regions = []
+        if not semantic_match and similarity < FULL_FRAME_CHANGE_SIMILARITY:
+            changed_regions.append(vjepa_pb2.ChangedRegion(
+                region=vjepa_pb2.Region(x=0, y=0, width=DIFF_SIZE - 1, height=DIFF_SIZE - 1),
+                change_type="modified",
+                significance=1.0,
+                description="Entire frame changed"
+            ))
+        elif not semantic_match:
+            regions = find_changed_region_array(self._diff_array(baseline_img), self._diff_array(actual_img))
+
+            for r in regions_to_dicts(regions[:10]):  # Limit to top 10 regions
+                changed_regions.append(vjepa_pb2.ChangedRegion(
+                    region=vjepa_pb2.Region(
+                        x=r["x"],
+                        y=r["y"],
+                        width=r["width"],
+                        height=r["height"]
+                    ),
+                    change_type="modified",
+                    significance=r.get("significance", 0.5),
+                    description=f"Visual change detected at ({r['x']}, {r['y']})"
+                ))
+
+        # Generate analysis
+        analysis = self._generate_analysis(similarity, semantic_match, changed_regions, ctx)
+
+        return vjepa_pb2.CompareFramesResponse(
+            similarity_score=similarity,
+            semantic_match=semantic_match,
+            confidence=0.95,
+            changed_regions=changed_regions,
+            analysis=analysis,
+            baseline_embedding=baseline_emb.numpy().tobytes(),
+            actual_embedding=actual_emb.numpy().tobytes(),
+        )
+
+    def _record_inference_time(self, inference_time: float):
+        """Track inference time (ms) for health reporting."""
+        self.inference_times.append(inference_time)
+
+    async def CompareFrames(self, request, context):
         """Compare two frames and return semantic similarity."""
+        return await self._run(self._compare_frames, request, context)
+
+    def _compare_frames(self, request, context):
+        """Blocking implementation of CompareFrames."""
         start_time = time.time()
-        self.request_count += 1
+        self.request_count = next(self._request_counter)
 
         try:
             # Load images
-            baseline_img = self._load_image(
-                data=request.baseline_data if request.baseline_data else None,
-                uri=request.baseline_uri if request.baseline_uri else None
-            )
-            actual_img = self._load_image(
-                data=request.actual_data if request.actual_data else None,
-                uri=request.actual_uri if request.actual_uri else None
-            )
+            baseline_img, actual_img = self._load_images([
+                (request.baseline_data or None, request.baseline_uri or None),
+                (request.actual_data or None, request.actual_uri or None),
+            ])
 
-            # Get embeddings
-            baseline_emb = self._get_embedding(baseline_img)
-            actual_emb = self._get_embedding(actual_img)
+            # Get both embeddings in one forward pass
+            baseline_key = self._source_key(request.baseline_data, request.baseline_uri)
+            embeddings = self._get_embeddings([baseline_img, actual_img], [baseline_key, None])
+            baseline_emb, actual_emb = embeddings[0:1], embeddings[1:2]
 
             # Compute cosine similarity
             similarity = F.cosine_similarity(baseline_emb, actual_emb).item()
 
-            # Determine threshold
-            threshold = 0.85
-            if request.settings and request.settings.similarity_threshold > 0:
-                threshold = request.settings.similarity_threshold
-            semantic_match = similarity >= threshold
-
-            # Find changed regions if not matching
-            changed_regions = []
-            if not semantic_match:
-                baseline_np = np.array(baseline_img.resize((512, 512)))
-                actual_np = np.array(actual_img.resize((512, 512)))
-                regions = find_changed_regions(baseline_np, actual_np)
-
-                for r in regions[:10]:  # Limit to top 10 regions
-                    changed_regions.append(vjepa_pb2.ChangedRegion(
-                        region=vjepa_pb2.Region(
-                            x=r["x"],
-                            y=r["y"],
-                            width=r["width"],
-                            height=r["height"]
-                        ),
-                        change_type="modified",
-                        significance=r.get("significance", 0.5),
-                        description=f"Visual change detected at ({r['x']}, {r['y']})"
-                    ))
-
-            # Generate analysis
-            analysis = self._generate_analysis(similarity, semantic_match, changed_regions, request.context)
+            threshold = self._similarity_threshold(request.settings)
+            response = self._build_compare_response(
+                baseline_img, actual_img, baseline_emb, actual_emb, similarity, threshold, request.context
+            )
 
             # Track inference time
             inference_time = (time.time() - start_time) * 1000
-            self.inference_times.append(inference_time)
-            if len(self.inference_times) > 1000:
-                self.inference_times = self.inference_times[-1000:]
-
-            logger.info(f"CompareFrames: similarity={similarity:.4f}, match={semantic_match}, time={inference_time:.2f}ms")
-
-            return vjepa_pb2.CompareFramesResponse(
-                similarity_score=similarity,
-                semantic_match=semantic_match,
-                confidence=0.95,
-                changed_regions=changed_regions,
-                analysis=analysis,
-                baseline_embedding=baseline_emb.cpu().float().numpy().tobytes(),
-                actual_embedding=actual_emb.cpu().float().numpy().tobytes(),
-            )
+            self._record_inference_time(inference_time)
+
+            logger.info(f"CompareFrames: similarity={similarity:.4f}, match={response.semantic_match}, time={inference_time:.2f}ms")
+
+            return response
 
         except Exception as e:
             logger.error(f"CompareFrames error: {e}", exc_info=True)
@@ -205,15 +577,19 @@ class VJEPAServicer(vjepa_pb2_grpc.VJEPAServiceServicer):
 
         return f"Major visual differences detected (similarity: {similarity:.1%}). The UI appears substantially different from baseline. This likely indicates a failure or major change."
 
-    def DetectStability(self, request, context):
+    async def DetectStability(self, request, context):
         """Detect if UI is stable (not loading/animating)."""
+        return await self._run(self._detect_stability, request, context)
+
+    def _detect_stability(self, request, context):
+        """Blocking implementation of DetectStability."""
         try:
             # Load frames
             frames = []
             if request.frames:
-                frames = [self._load_image(data=f) for f in request.frames]
+                frames = self._load_images([(f, None) for f in request.frames])
             elif request.frame_uris:
-                frames = [self._load_image(uri=u) for u in request.frame_uris]
+                frames = self._load_images([(None, u) for u in request.frame_uris])
 
             if len(frames) < 2:
                 return vjepa_pb2.DetectStabilityResponse(
@@ -226,31 +602,35 @@ class VJEPAServicer(vjepa_pb2_grpc.VJEPAServiceServicer):
             threshold = request.stability_threshold if request.stability_threshold > 0 else 0.98
             min_stable = request.min_stable_frames if request.min_stable_frames > 0 else 3
 
-            # Get embeddings for all frames
-            embeddings = [self._get_embedding(f) for f in frames]
-
-            # Find first stable point
-            stable_count = 0
-            stable_frame_index = 0
-            similarities = []
-
-            for i in range(1, len(embeddings)):
-                similarity = F.cosine_similarity(embeddings[i-1], embeddings[i]).item()
-                similarities.append(similarity)
-
-                if similarity >= threshold:
-                    stable_count += 1
-                    if stable_count >= min_stable - 1:
-                        stable_frame_index = max(0, i - min_stable + 1)
-                        break
-                else:
-                    stable_count = 0
+            # Get embeddings for all frames in one forward pass, and all
+            # consecutive-frame similarities with one op
+            embeddings = self._get_embeddings(frames)
+            similarities = F.cosine_similarity(embeddings[:-1], embeddings[1:], dim=-1).numpy()
+
+            # Length of the run of stable transitions ending at each index:
+            # stable count so far minus the count at the last unstable one
+            stable = similarities >= threshold
+            counts = np.cumsum(stable)
+            runs = counts - np.maximum.accumulate(np.where(stable, 0, counts))
+
+            # Find first stable point: the first transition completing a run
+            # of min_stable - 1, else report the trailing run
+            hits = np.flatnonzero(stable & (runs >= min_stable - 1))
+            if hits.size:
+                stable_count = int(runs[hits[0]])
+                stable_frame_index = max(0, int(hits[0]) + 1 - min_stable + 1)
+                # Score only the transitions up to the stable point
+                scored = slice(0, int(hits[0]) + 1)
+            else:
+                stable_count = int(runs[-1])
+                stable_frame_index = 0
+                scored = slice(None)
 
             is_stable = stable_count >= min_stable - 1
-            stability_score = sum(1 for s in similarities if s >= threshold) / len(similarities) if similarities else 1.0
+            stability_score = float(stable[scored].mean())
 
             if is_stable:
-                analysis = f"UI is stable from frame {stable_frame_index} (avg similarity: {np.mean(similarities):.3f})"
+                analysis = f"UI is stable from frame {stable_frame_index} (avg similarity: {similarities[scored].mean():.3f})"
             else:
                 analysis = f"UI still changing, {stable_count} consecutive stable frames detected (threshold: {min_stable})"
 
@@ -269,20 +649,24 @@ class VJEPAServicer(vjepa_pb2_grpc.VJEPAServiceServicer):
             context.set_details(str(e))
             return vjepa_pb2.DetectStabilityResponse()
 
-    def GenerateEmbedding(self, request, context):
+    async def GenerateEmbedding(self, request, context):
         """Generate embedding vector for a frame."""
+        return await self._run(self._generate_embedding, request, context)
+
+    def _generate_embedding(self, request, context):
+        """Blocking implementation of GenerateEmbedding."""
         try:
             image = self._load_image(
                 data=request.image_data if request.image_data else None,
                 uri=request.image_uri if request.image_uri else None
             )
 
-            embedding = self._get_embedding(image)
+            embedding = self._get_raw_embedding(image)
 
             if request.normalize:
                 embedding = F.normalize(embedding, p=2, dim=-1)
 
-            embedding_np = embedding.cpu().float().numpy()
+            embedding_np = embedding.numpy()
 
             logger.info(f"GenerateEmbedding: dim={embedding_np.shape[-1]}")
 
@@ -298,68 +682,106 @@ class VJEPAServicer(vjepa_pb2_grpc.VJEPAServiceServicer):
             context.set_details(str(e))
             return vjepa_pb2.GenerateEmbeddingResponse()
 
-    def BatchCompare(self, request, context):
+    async def BatchCompare(self, request, context):
         """Compare multiple frame pairs."""
-        results = []
-        total_similarity = 0.0
-        matches = 0
-
-        for pair in request.pairs:
-            compare_req = vjepa_pb2.CompareFramesRequest(
-                baseline_data=pair.baseline_data,
-                baseline_uri=pair.baseline_uri,
-                actual_data=pair.actual_data,
-                actual_uri=pair.actual_uri,
-                context=pair.context,
-                settings=request.settings
+        return await self._run(self._batch_compare, request, context)
+
+    def _batch_compare(self, request, context):
+        """Blocking implementation of BatchCompare."""
+        start_time = time.time()
+        self.request_count = next(self._request_counter)
+
+        try:
+            n_pairs = len(request.pairs)
+            sources = (
+                [(pair.baseline_data or None, pair.baseline_uri or None) for pair in request.pairs]
+                + [(pair.actual_data or None, pair.actual_uri or None) for pair in request.pairs]
             )
+            keys = [self._source_key(data, uri) for data, uri in sources]
+
+            # Load and embed each distinct image once; suites often share a
+            # baseline across many pairs
+            unique_sources = dict(zip(keys, sources))
+            unique_keys = list(dict.fromkeys(keys))
+            rows = {key: i for i, key in enumerate(unique_keys)}
+            unique_images = self._load_images([unique_sources[key] for key in unique_keys])
+
+            images = [unique_images[rows[key]] for key in keys]
+            baselines, actuals = images[:n_pairs], images[n_pairs:]
+
+            results = []
+            total_similarity = 0.0
+            matches = 0
+
+            if request.pairs:
+                # Embed the distinct images in one forward pass; baselines go
+                # through the cache
+                baseline_keys = set(keys[:n_pairs])
+                cache_keys = [key if key in baseline_keys else None for key in unique_keys]
+                embeddings = self._get_embeddings(unique_images, cache_keys)
+                embeddings = embeddings[torch.tensor([rows[key] for key in keys])]
+                baseline_embs = embeddings[:n_pairs]
+                actual_embs = embeddings[n_pairs:]
+                similarities = F.cosine_similarity(baseline_embs, actual_embs, dim=-1).tolist()
+
+                threshold = self._similarity_threshold(request.settings)
+                for i, pair in enumerate(request.pairs):
+                    result = self._build_compare_response(
+                        baselines[i], actuals[i],
+                        baseline_embs[i:i + 1], actual_embs[i:i + 1],
+                        similarities[i], threshold, pair.context
+                    )
+                    results.append(vjepa_pb2.BatchCompareResult(
+                        pair_id=pair.pair_id,
+                        result=result
+                    ))
 
-            result = self.CompareFrames(compare_req, context)
+                    total_similarity += result.similarity_score
+                    if result.semantic_match:
+                        matches += 1
 
-            results.append(vjepa_pb2.BatchCompareResult(
-                pair_id=pair.pair_id,
-                result=result
-            ))
+            avg_similarity = total_similarity / len(request.pairs) if request.pairs else 0.0
 
-            total_similarity += result.similarity_score
-            if result.semantic_match:
-                matches += 1
+            self._record_inference_time((time.time() - start_time) * 1000)
 
-        avg_similarity = total_similarity / len(request.pairs) if request.pairs else 0.0
+            logger.info(f"BatchCompare: {len(request.pairs)} pairs, avg_similarity={avg_similarity:.3f}, matches={matches}")
 
-        logger.info(f"BatchCompare: {len(request.pairs)} pairs, avg_similarity={avg_similarity:.3f}, matches={matches}")
+            return vjepa_pb2.BatchCompareResponse(
+                results=results,
+                average_similarity=avg_similarity,
+                matches=matches,
+                mismatches=len(request.pairs) - matches
+            )
 
-        return vjepa_pb2.BatchCompareResponse(
-            results=results,
-            average_similarity=avg_similarity,
-            matches=matches,
-            mismatches=len(request.pairs) - matches
-        )
+        except Exception as e:
+            logger.error(f"BatchCompare error: {e}", exc_info=True)
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(str(e))
+            return vjepa_pb2.BatchCompareResponse()
 
-    def AnalyzeChange(self, request, context):
+    async def AnalyzeChange(self, request, context):
         """Analyze and describe changes between frames."""
+        return await self._run(self._analyze_change, request, context)
+
+    def _analyze_change(self, request, context):
+        """Blocking implementation of AnalyzeChange."""
         try:
-            before = self._load_image(
-                data=request.before_data if request.before_data else None,
-                uri=request.before_uri if request.before_uri else None
-            )
-            after = self._load_image(
-                data=request.after_data if request.after_data else None,
-                uri=request.after_uri if request.after_uri else None
-            )
+            before, after = self._load_images([
+                (request.before_data or None, request.before_uri or None),
+                (request.after_data or None, request.after_uri or None),
+            ])
 
-            before_emb = self._get_embedding(before)
-            after_emb = self._get_embedding(after)
+            before_key = self._source_key(request.before_data, request.before_uri)
+            embeddings = self._get_embeddings([before, after], [before_key, None])
+            before_emb, after_emb = embeddings[0:1], embeddings[1:2]
 
             similarity = F.cosine_similarity(before_emb, after_emb).item()
 
             # Find changed regions
             changes = []
             if similarity < 0.95:
-                before_np = np.array(before.resize((512, 512)))
-                after_np = np.array(after.resize((512, 512)))
-                regions = find_changed_regions(before_np, after_np)
-                for r in regions[:5]:
+                regions = find_changed_region_array(self._diff_array(before), self._diff_array(after))
+                for r in regions_to_dicts(regions[:5]):
                     changes.append(f"Change at ({r['x']}, {r['y']}): {r['width']}x{r['height']} pixels")
 
             # Determine if change is expected based on action
@@ -401,7 +823,7 @@ class VJEPAServicer(vjepa_pb2_grpc.VJEPAServiceServicer):
             context.set_details(str(e))
             return vjepa_pb2.AnalyzeChangeResponse()
 
-    def HealthCheck(self, request, context):
+    async def HealthCheck(self, request, context):
         """Health check endpoint."""
         memory_used = 0
         memory_total = 0
@@ -412,7 +834,7 @@ class VJEPAServicer(vjepa_pb2_grpc.VJEPAServiceServicer):
 
         avg_inference = 0.0
         if self.inference_times:
-            recent = self.inference_times[-100:]
+            recent = list(itertools.islice(reversed(self.inference_times), 100))
             avg_inference = sum(recent) / len(recent)
 
         return vjepa_pb2.HealthCheckResponse(
@@ -425,22 +847,45 @@ class VJEPAServicer(vjepa_pb2_grpc.VJEPAServiceServicer):
         )
 
 
-def serve(port: int = 50051, model_path: str = "./models/vjepa2", max_workers: int = 4):
-    """Start the gRPC server."""
-    server = grpc.server(
-        futures.ThreadPoolExecutor(max_workers=max_workers),
+async def serve_async(
+    port: int = 50051,
+    model_path: str = "./models/vjepa2",
+    max_workers: int = 4,
+    compile_model: bool = False,
+    microbatch_size: int = 0,
+    microbatch_wait_ms: float = 5.0,
+    cuda_graphs: bool = True,
+    embedding_cache_size: int = 4096,
+    gpu_preprocess: bool = False
+):
+    """Start the asyncio gRPC server."""
+    server = grpc.aio.server(
         options=[
             ('grpc.max_send_message_length', 50 * 1024 * 1024),  # 50MB
             ('grpc.max_receive_message_length', 50 * 1024 * 1024),
         ]
     )
     vjepa_pb2_grpc.add_VJEPAServiceServicer_to_server(
-        VJEPAServicer(model_path), server
+        VJEPAServicer(
+            model_path,
+            compile_model=compile_model,
+            microbatch_size=microbatch_size,
+            microbatch_wait_ms=microbatch_wait_ms,
+            cuda_graphs=cuda_graphs,
+            embedding_cache_size=embedding_cache_size,
+            max_workers=max_workers,
+            gpu_preprocess=gpu_preprocess
+        ), server
     )
     server.add_insecure_port(f"[::]:{port}")
-    server.start()
+    await server.start()
     logger.info(f"V-JEPA service started on port {port}")
-    server.wait_for_termination()
+    await server.wait_for_termination()
+
+
+def serve(*args, **kwargs):
+    """Start the gRPC server; see serve_async for arguments."""
+    asyncio.run(serve_async(*args, **kwargs))
 
 
 if __name__ == "__main__":
@@ -450,6 +895,22 @@ if __name__ == "__main__":
     parser.add_argument("--model-path", type=str, default="./models/vjepa2", help="Path to model weights")
     parser.add_argument("--device", type=str, default="cuda", help="Device (cuda or cpu)")
     parser.add_argument("--workers", type=int, default=4, help="Number of worker threads")
+    parser.add_argument("--compile", action="store_true", help="Compile the encoder with torch.compile")
+    parser.add_argument("--microbatch-size", type=int, default=0, help="Max images per coalesced forward pass (0 disables micro-batching)")
+    parser.add_argument("--microbatch-wait-ms", type=float, default=5.0, help="Max time to wait for requests to coalesce")
+    parser.add_argument("--no-cuda-graphs", action="store_true", help="Disable CUDA graph replay for single-image inference")
+    parser.add_argument("--embedding-cache-size", type=int, default=4096, help="Max cached baseline embeddings (0 disables)")
+    parser.add_argument("--gpu-preprocess", action="store_true", help="Resize and normalize frames on the GPU")
     args = parser.parse_args()
 
-    serve(args.port, args.model_path, args.workers)
+    serve(
+        args.port,
+        args.model_path,
+        args.workers,
+        args.compile,
+        args.microbatch_size,
+        args.microbatch_wait_ms,
+        not args.no_cuda_graphs,
+        args.embedding_cache_size,
+        args.gpu_preprocess
+    )
@@ -3,31 +3,275 @@ Utility functions for V-JEPA service.
 """
 
 import torch
+import torch.nn.functional as F
 from PIL import Image
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from io import BytesIO
 import numpy as np
-from torchvision import transforms
+from torchvision.transforms import v2
+from typing import List, Optional, Union
+import functools
+import hashlib
 import os
+import threading
 import logging
 
+# Optional OpenCV for SIMD pixel arithmetic
+try:
+    import cv2
+    HAS_CV2 = True
+except ImportError:
+    HAS_CV2 = False
+
+# Optional libjpeg-turbo (SIMD) JPEG decoder
+try:
+    import simplejpeg
+    HAS_SIMPLEJPEG = True
+except ImportError:
+    HAS_SIMPLEJPEG = False
+
+# Optional Numba for the per-region statistics pass
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
 logger = logging.getLogger(__name__)
 
-# Image preprocessing for vision models
-preprocess = transforms.Compose([
-    transforms.Resize((224, 224)),
-    transforms.ToTensor(),
-    transforms.Normalize(
-        mean=[0.485, 0.456, 0.406],
-        std=[0.229, 0.224, 0.225]
-    ),
-])
+# PyTorch's antialiased bilinear kernel runs on uint8 directly (SIMD, on
+# channels-last input) on AVX2/AVX512 CPUs; elsewhere resize in float
+NATIVE_UINT8_RESIZE = torch.backends.cpu.get_cpu_capability() in ("AVX2", "AVX512")
+
+# ImageNet normalization folded into the 0-255 range:
+# (x / 255 - mean) / std == (x - 255 * mean) * (1 / (255 * std))
+_MEAN = torch.tensor([0.485, 0.456, 0.406]).mul_(255).view(3, 1, 1)
+_INV_STD = torch.tensor([0.229, 0.224, 0.225]).mul_(255).reciprocal_().view(3, 1, 1)
+
+
+@functools.lru_cache(maxsize=None)
+def _normalize_constants(device: torch.device) -> tuple:
+    """_MEAN and _INV_STD on the given device, copied there once."""
+    return _MEAN.to(device), _INV_STD.to(device)
+
+
+def normalize_(x: torch.Tensor) -> torch.Tensor:
+    """In-place ImageNet normalization of a float image (or batch) in 0-255."""
+    mean, inv_std = _normalize_constants(x.device)
+    return x.sub_(mean).mul_(inv_std)
+
+
+# The same normalization as a per-channel x * scale + bias
+_SCALE = _INV_STD.flatten().numpy()
+_BIAS = (-_MEAN * _INV_STD).flatten().numpy()
+
+if HAS_NUMBA:
+    @njit(cache=True, fastmath=True)
+    def _normalize_hwc_to_chw(image, out, scale, bias):
+        """Normalize a uint8 HWC image into a float32 CHW array in one pass."""
+        height, width, channels = image.shape
+        for y in range(height):
+            for x in range(width):
+                for c in range(channels):
+                    out[c, y, x] = image[y, x, c] * scale[c] + bias[c]
+
+
+def resize_uint8(image: torch.Tensor, size: tuple = (224, 224)) -> torch.Tensor:
+    """
+    Antialiased bilinear resize of a uint8 CHW image.
+
+    Returns uint8 where the native kernel is available, otherwise float
+    in the same 0-255 range.
+    """
+    batch = image.unsqueeze(0)
+    if NATIVE_UINT8_RESIZE:
+        batch = batch.contiguous(memory_format=torch.channels_last)
+    else:
+        batch = batch.float()
+    return F.interpolate(batch, size=size, mode="bilinear", align_corners=False, antialias=True)[0]
+
+
+def preprocess(image: torch.Tensor) -> torch.Tensor:
+    """Image preprocessing for vision models, on a uint8 CHW tensor"""
+    resized = resize_uint8(image)
+    if HAS_NUMBA and resized.dtype == torch.uint8:
+        # Channels-last uint8 is HWC in memory: convert, normalize and
+        # reorder to contiguous CHW in a single pass
+        out = np.empty(resized.shape, dtype=np.float32)
+        _normalize_hwc_to_chw(resized.permute(1, 2, 0).numpy(), out, _SCALE, _BIAS)
+        return torch.from_numpy(out)
+    return normalize_(resized.float())
+
+
+def preprocess_image(image: Union[Image.Image, torch.Tensor]) -> torch.Tensor:
+    """
+    Preprocess an image for model input.
+
+    Args:
+        image: PIL image, or uint8 tensor in CHW or HWC layout
+
+    Returns:
+        Tensor of shape (3, 224, 224); stack several for a batch
+    """
+    if isinstance(image, Image.Image):
+        image = v2.functional.pil_to_tensor(image)
+    elif image.dim() == 3 and image.shape[-1] == 3 and image.shape[0] != 3:
+        image = image.permute(2, 0, 1)
+    return preprocess(image)
+
+
+def preprocess_images(
+    images: List[Union[Image.Image, torch.Tensor]],
+    device: Union[str, torch.device] = "cuda"
+) -> torch.Tensor:
+    """
+    Preprocess a batch of images on the device.
+
+    Images are stacked straight into pinned uint8 staging memory and
+    uploaded non-blocking on the current stream, then resized and
+    normalized there; same-sized images go up in a single copy.
+
+    Returns:
+        Tensor of shape (B, 3, 224, 224) on the device
+    """
+    device = torch.device(device)
+    tensors = []
+    for image in images:
+        if isinstance(image, Image.Image):
+            image = v2.functional.pil_to_tensor(image)
+        elif image.shape[-1] == 3 and image.shape[0] != 3:
+            image = image.permute(2, 0, 1)
+        tensors.append(image)
+
+    def upload(group: List[torch.Tensor]) -> torch.Tensor:
+        staging = torch.empty((len(group), *group[0].shape), dtype=torch.uint8,
+                              pin_memory=device.type == "cuda")
+        torch.stack(group, out=staging)
+        return staging.to(device, non_blocking=True)
+
+    if all(t.shape == tensors[0].shape for t in tensors):
+        uploads = [upload(tensors)]
+    else:
+        uploads = [upload([t]) for t in tensors]
+
+    batch = torch.cat([
+        F.interpolate(u.float(), size=(224, 224), mode="bilinear", align_corners=False, antialias=True)
+        for u in uploads
+    ])
+
+    return normalize_(batch)
+
+
+# Shared HTTP session: keep-alive connections to image hosts are reused
+# across downloads instead of paying TCP/TLS setup per request
+_session = requests.Session()
+_http_adapter = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504]),
+)
+_session.mount("http://", _http_adapter)
+_session.mount("https://", _http_adapter)
+
+
+@functools.lru_cache(maxsize=4)
+def _s3_client(endpoint: str, access_key: str, secret_key: str):
+    """S3 client per endpoint/credentials; boto3 clients are thread-safe."""
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client(
+        "s3",
+        endpoint_url=endpoint,
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        # Keep a connection for each concurrent part download
+        config=Config(signature_version='s3v4', max_pool_connections=32),
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _s3_transfer_config():
+    """Ranged-GET settings for objects large enough to split."""
+    from boto3.s3.transfer import TransferConfig
+
+    return TransferConfig(
+        multipart_threshold=4 * 1024 * 1024,
+        multipart_chunksize=4 * 1024 * 1024,
+        max_concurrency=8,
+        use_threads=True,
+    )
+
+
+# Optional on-disk cache of decoded remote images, keyed by SHA-256 of the
+# URI and evicted least-recently-used first. Disabled unless a directory
+# is set; only suitable when URIs are not overwritten in place.
+IMAGE_CACHE_DIR = os.environ.get("VJEPA_IMAGE_CACHE_DIR", "")
+IMAGE_CACHE_BYTES = int(os.environ.get("VJEPA_IMAGE_CACHE_MB", "2048")) * 1024 * 1024
+
+_image_cache_lock = threading.Lock()
+_image_cache_bytes = None  # Total size on disk, scanned on first store
 
 
-def preprocess_image(image: Image.Image) -> torch.Tensor:
-    """Preprocess image for model input."""
-    tensor = preprocess(image)
-    return tensor.unsqueeze(0)  # Add batch dimension
+def _image_cache_path(uri: str) -> str:
+    return os.path.join(IMAGE_CACHE_DIR, hashlib.sha256(uri.encode()).hexdigest() + ".npy")
+
+
+def _image_cache_get(uri: str) -> Optional[Image.Image]:
+    path = _image_cache_path(uri)
+    try:
+        pixels = np.load(path, mmap_mode="r")
+        os.utime(path)  # Mark as recently used
+    except (OSError, ValueError):
+        return None
+    return Image.fromarray(pixels)
+
+
+def _image_cache_put(uri: str, image: Image.Image) -> None:
+    global _image_cache_bytes
+
+    path = _image_cache_path(uri)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, np.asarray(image))
+    size = os.path.getsize(tmp)
+
+    with _image_cache_lock:
+        # Concurrent cold fetches of one URI both store it; count only the
+        # growth, not the entry being overwritten
+        try:
+            size -= os.path.getsize(path)
+        except OSError:
+            pass
+        os.replace(tmp, path)  # Atomic; readers never see a partial file
+
+        if _image_cache_bytes is None:
+            _image_cache_bytes = 0
+            with os.scandir(IMAGE_CACHE_DIR) as it:
+                for entry in it:
+                    if entry.name.endswith(".npy"):
+                        _image_cache_bytes += entry.stat().st_size
+        else:
+            _image_cache_bytes += size
+
+        if _image_cache_bytes <= IMAGE_CACHE_BYTES:
+            return
+
+        # Evict oldest entries down to 90% of the limit
+        with os.scandir(IMAGE_CACHE_DIR) as it:
+            entries = sorted(
+                (e.stat().st_mtime, e.stat().st_size, e.path) for e in it if e.name.endswith(".npy")
+            )
+        for _, entry_size, entry_path in entries:
+            if _image_cache_bytes <= IMAGE_CACHE_BYTES * 0.9:
+                break
+            try:
+                os.remove(entry_path)
+            except OSError:
+                continue
+            _image_cache_bytes -= entry_size
 
 
 def download_image(uri: str) -> Image.Image:
@@ -38,21 +282,56 @@ def download_image(uri: str) -> Image.Image:
     - HTTP/HTTPS URLs
     - S3/MinIO URIs (s3://bucket/key)
     - Local file paths
+
+    Remote images are cached on disk when VJEPA_IMAGE_CACHE_DIR is set.
     """
+    if not IMAGE_CACHE_DIR or not uri.startswith(("http://", "https://", "s3://", "minio://")):
+        return _fetch_image(uri)
+
+    image = _image_cache_get(uri)
+    if image is not None:
+        return image
+
+    image = _fetch_image(uri)
+    try:
+        os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+        _image_cache_put(uri, image)
+    except OSError as e:
+        logger.warning(f"Failed to cache image {uri}: {e}")
+    return image
+
+
+def decode_image(data: bytes) -> Image.Image:
+    """
+    Decode encoded image bytes to an RGB image.
+
+    JPEGs go through libjpeg-turbo via simplejpeg when it is installed;
+    other formats, and JPEGs it rejects, through Pillow.
+    """
+    if HAS_SIMPLEJPEG and data[:2] == b"\xff\xd8":
+        try:
+            return Image.fromarray(simplejpeg.decode_jpeg(data, colorspace="RGB"))
+        except ValueError:
+            pass
+    return Image.open(BytesIO(data)).convert("RGB")
+
+
+def _fetch_image(uri: str) -> Image.Image:
+    """Fetch and decode an image from an HTTP(S), S3/MinIO or local URI."""
     if uri.startswith("http://") or uri.startswith("https://"):
         try:
-            response = requests.get(uri, timeout=30)
-            response.raise_for_status()
-            return Image.open(BytesIO(response.content)).convert("RGB")
+            with _session.get(uri, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                # Decode straight from the socket; undo any gzip/deflate
+                # transfer encoding first
+                response.raw.decode_content = True
+                return Image.open(response.raw).convert("RGB")
         except Exception as e:
             logger.error(f"Failed to download from HTTP: {e}")
             raise
 
     elif uri.startswith("s3://") or uri.startswith("minio://"):
         try:
-            import boto3
-            from botocore.config import Config
-
             # Parse URI
             uri_clean = uri.replace("s3://", "").replace("minio://", "")
             parts = uri_clean.split("/", 1)
@@ -64,17 +343,12 @@ def download_image(uri: str) -> Image.Image:
             access_key = os.environ.get("MINIO_ACCESS_KEY", "minioadmin")
             secret_key = os.environ.get("MINIO_SECRET_KEY", "minioadmin")
 
-            # Create S3 client
-            s3 = boto3.client(
-                "s3",
-                endpoint_url=endpoint,
-                aws_access_key_id=access_key,
-                aws_secret_access_key=secret_key,
-                config=Config(signature_version='s3v4'),
-            )
+            s3 = _s3_client(endpoint, access_key, secret_key)
 
-            response = s3.get_object(Bucket=bucket, Key=key)
-            return Image.open(BytesIO(response["Body"].read())).convert("RGB")
+            # Large objects download as parallel ranged GETs
+            buf = BytesIO()
+            s3.download_fileobj(bucket, key, buf, Config=_s3_transfer_config())
+            return decode_image(buf.getbuffer())
         except Exception as e:
             logger.error(f"Failed to download from S3/MinIO: {e}")
             raise
@@ -82,11 +356,132 @@ def download_image(uri: str) -> Image.Image:
     else:
         # Local file
         if os.path.exists(uri):
-            return Image.open(uri).convert("RGB")
+            with open(uri, "rb") as f:
+                return decode_image(f.read())
         else:
             raise FileNotFoundError(f"File not found: {uri}")
 
 
+def _resize_to(image: np.ndarray, shape: tuple) -> np.ndarray:
+    """Resize a uint8 image array to shape[:2] (height, width)."""
+    height, width = shape[:2]
+    if HAS_CV2:
+        # Area averaging when shrinking; reads the array in place
+        return cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+    return np.asarray(Image.fromarray(image).resize((width, height), Image.BILINEAR))
+
+
+# ITU-R BT.601 luma weights (R, G, B)
+_LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def _diff_gray(baseline: np.ndarray, actual: np.ndarray) -> np.ndarray:
+    """
+    Per-pixel BT.601 luma of |baseline - actual| for uint8 RGB images.
+
+    With OpenCV this is uint8 absdiff plus the fixed-point cvtColor kernel
+    (uint8 result); otherwise a float32 weighted channel sum.
+    """
+    if HAS_CV2:
+        return cv2.cvtColor(cv2.absdiff(baseline, actual), cv2.COLOR_RGB2GRAY)
+    diff = np.subtract(baseline, actual, dtype=np.int16)
+    np.abs(diff, out=diff)
+    return np.einsum("hwc,c->hw", diff.astype(np.float32), _LUMA)
+
+
+if HAS_NUMBA:
+    @njit(cache=True)
+    def _aggregate_labels(labeled, values, num_labels):
+        """Bounding box, pixel count and value sum per label in one pass over the image."""
+        height, width = labeled.shape
+        x_min = np.full(num_labels + 1, width, np.int64)
+        x_max = np.full(num_labels + 1, -1, np.int64)
+        y_min = np.full(num_labels + 1, height, np.int64)
+        y_max = np.full(num_labels + 1, -1, np.int64)
+        counts = np.zeros(num_labels + 1, np.int64)
+        sums = np.zeros(num_labels + 1, np.float64)
+        for y in range(height):
+            for x in range(width):
+                label = labeled[y, x]
+                if label:
+                    x_min[label] = min(x_min[label], x)
+                    x_max[label] = max(x_max[label], x)
+                    y_min[label] = min(y_min[label], y)
+                    y_max[label] = max(y_max[label], y)
+                    counts[label] += 1
+                    sums[label] += values[y, x]
+        return x_min, x_max, y_min, y_max, counts, sums
+
+
+def _label_stats(labeled: np.ndarray, values: np.ndarray, num_labels: int) -> tuple:
+    """
+    Per-label statistics for labels 1..num_labels.
+
+    Returns:
+        (x_min, x_max, y_min, y_max, counts, sums), each indexed by label
+    """
+    if HAS_NUMBA:
+        return _aggregate_labels(labeled, values, num_labels)
+
+    height, width = labeled.shape
+    labels = labeled.ravel()
+    counts = np.bincount(labels, minlength=num_labels + 1)
+    sums = np.bincount(labels, weights=values.ravel(), minlength=num_labels + 1)
+
+    x_min = np.full(num_labels + 1, width, np.int64)
+    x_max = np.full(num_labels + 1, -1, np.int64)
+    y_min = np.full(num_labels + 1, height, np.int64)
+    y_max = np.full(num_labels + 1, -1, np.int64)
+
+    # Group foreground pixels into one run per label, then reduce each run
+    pixels = np.flatnonzero(labels)
+    if len(pixels):
+        pixels = pixels[np.argsort(labels[pixels], kind="stable")]
+        run_labels = labels[pixels]
+        starts = np.flatnonzero(np.diff(run_labels, prepend=-1))
+        present = run_labels[starts]
+        ys, xs = np.divmod(pixels, width)
+        x_min[present] = np.minimum.reduceat(xs, starts)
+        x_max[present] = np.maximum.reduceat(xs, starts)
+        y_min[present] = np.minimum.reduceat(ys, starts)
+        y_max[present] = np.maximum.reduceat(ys, starts)
+    return x_min, x_max, y_min, y_max, counts, sums
+
+
+def _block_sum(values: np.ndarray, factor: int) -> np.ndarray:
+    """Sum over factor x factor blocks, zero-padding ragged edges."""
+    height, width = values.shape
+    pad_h, pad_w = -height % factor, -width % factor
+    if pad_h or pad_w:
+        values = np.pad(values, ((0, pad_h), (0, pad_w)))
+    h, w = values.shape
+    return values.reshape(h // factor, factor, w // factor, factor).sum(axis=(1, 3))
+
+
+_OPENING_KERNEL = np.ones((3, 3), np.uint8)
+
+# Changed-pixel masks are labeled at roughly this resolution
+LABEL_RESOLUTION = 256
+
+
+# One record per changed region; kept as columns so filtering and sorting
+# stay vectorized, with dicts built only for the regions a caller returns
+REGION_DTYPE = np.dtype([
+    ("x", "i4"),
+    ("y", "i4"),
+    ("width", "i4"),
+    ("height", "i4"),
+    ("pixel_count", "i4"),
+    ("avg_intensity", "f4"),
+    ("significance", "f4"),
+])
+
+
+def regions_to_dicts(regions: np.ndarray) -> list:
+    """Convert a REGION_DTYPE array to a list of region dictionaries."""
+    return [dict(zip(REGION_DTYPE.names, row)) for row in regions.tolist()]
+
+
 def find_changed_regions(
     baseline: np.ndarray,
     actual: np.ndarray,
@@ -105,6 +500,21 @@ def find_changed_regions(
     Returns:
         List of changed region dictionaries
     """
+    return regions_to_dicts(find_changed_region_array(baseline, actual, threshold, min_region_size))
+
+
+def find_changed_region_array(
+    baseline: np.ndarray,
+    actual: np.ndarray,
+    threshold: float = 30,
+    min_region_size: int = 50
+) -> np.ndarray:
+    """
+    Find regions that changed between two images, as a REGION_DTYPE array
+    sorted by significance (highest first).
+
+    Takes the same arguments as find_changed_regions.
+    """
     try:
         from scipy import ndimage
     except ImportError:
@@ -113,119 +523,177 @@ def find_changed_regions(
 
     # Ensure same size
     if baseline.shape != actual.shape:
-        actual = np.array(Image.fromarray(actual).resize(
-            (baseline.shape[1], baseline.shape[0])
-        ))
+        actual = _resize_to(actual, baseline.shape)
 
     # Compute difference
-    diff = np.abs(baseline.astype(float) - actual.astype(float))
-    diff_gray = np.mean(diff, axis=2)
+    diff_gray = _diff_gray(baseline, actual)
 
     # Threshold to binary mask
     changed_mask = diff_gray > threshold
 
-    # Find connected components
-    labeled, num_features = ndimage.label(changed_mask)
-
-    regions = []
-    for i in range(1, num_features + 1):
-        region_mask = labeled == i
-        ys, xs = np.where(region_mask)
+    # 3x3 opening drops isolated noise pixels and hairlines before they
+    # become components of their own
+    if HAS_CV2:
+        changed_mask = cv2.morphologyEx(changed_mask.view(np.uint8), cv2.MORPH_OPEN, _OPENING_KERNEL).view(bool)
+    else:
+        changed_mask = ndimage.binary_opening(changed_mask, structure=_OPENING_KERNEL)
+    height, width = changed_mask.shape
+
+    # Label a block-reduced mask: a cell is changed if any of its pixels
+    # is, so labeling costs 1/factor^2 and speckle within a cell merges.
+    # Pixel counts and intensity sums are carried per cell, so they stay
+    # exact; boxes are cell-aligned.
+    factor = max(1, round(min(height, width) / LABEL_RESOLUTION))
+    if factor > 1:
+        cell_counts = _block_sum(changed_mask, factor)
+        cell_sums = _block_sum(np.where(changed_mask, diff_gray, 0), factor)
+        coarse_mask = cell_counts > 0
+    else:
+        cell_counts, cell_sums, coarse_mask = changed_mask, diff_gray, changed_mask
 
-        if len(xs) < min_region_size:
-            continue
+    # Find connected components
+    labeled, num_features = ndimage.label(coarse_mask)
 
-        x_min, x_max = int(xs.min()), int(xs.max())
-        y_min, y_max = int(ys.min()), int(ys.max())
+    x_min, x_max, y_min, y_max, counts, sums = _label_stats(labeled, cell_sums, num_features)
+    if factor > 1:
+        counts = np.bincount(labeled.ravel(), weights=cell_counts.ravel(), minlength=num_features + 1)
+    keep = np.flatnonzero(counts[1:] >= min_region_size) + 1
 
-        # Calculate change intensity in this region
-        region_diff = diff_gray[region_mask]
-        avg_intensity = float(np.mean(region_diff))
+    # Scale cell boxes back to pixels, clipped to the image
+    x0, y0 = x_min[keep] * factor, y_min[keep] * factor
+    x1 = np.minimum((x_max[keep] + 1) * factor, width) - 1
+    y1 = np.minimum((y_max[keep] + 1) * factor, height) - 1
 
-        regions.append({
-            "x": x_min,
-            "y": y_min,
-            "width": x_max - x_min,
-            "height": y_max - y_min,
-            "pixel_count": len(xs),
-            "avg_intensity": avg_intensity,
-            "significance": min(1.0, avg_intensity / 128.0)  # Normalize to 0-1
-        })
+    regions = np.empty(len(keep), dtype=REGION_DTYPE)
+    regions["x"] = x0
+    regions["y"] = y0
+    regions["width"] = x1 - x0
+    regions["height"] = y1 - y0
+    regions["pixel_count"] = counts[keep]
 
-    # Sort by significance
-    regions.sort(key=lambda r: r["significance"], reverse=True)
+    # Calculate change intensity in each region
+    avg_intensity = sums[keep] / counts[keep]
+    regions["avg_intensity"] = avg_intensity
+    regions["significance"] = np.minimum(1.0, avg_intensity / 128.0)  # Normalize to 0-1
 
-    return regions
+    # Sort by significance (stable, like list.sort)
+    return regions[np.argsort(-regions["significance"], kind="stable")]
 
 
 def _find_changed_regions_basic(
     baseline: np.ndarray,
     actual: np.ndarray,
     threshold: float = 30
-) -> list:
-    """Basic region detection without scipy."""
+) -> np.ndarray:
+    """Basic region detection without scipy: one box around all changes."""
     # Ensure same size
     if baseline.shape != actual.shape:
-        actual = np.array(Image.fromarray(actual).resize(
-            (baseline.shape[1], baseline.shape[0])
-        ))
+        actual = _resize_to(actual, baseline.shape)
 
     # Compute difference
-    diff = np.abs(baseline.astype(float) - actual.astype(float))
-    diff_gray = np.mean(diff, axis=2)
+    diff_gray = _diff_gray(baseline, actual)
 
     # Find bounding box of all changes
     changed_mask = diff_gray > threshold
-    if not np.any(changed_mask):
-        return []
-
-    ys, xs = np.where(changed_mask)
+    ys, xs = np.nonzero(changed_mask)
     if len(xs) == 0:
-        return []
-
-    return [{
-        "x": int(xs.min()),
-        "y": int(ys.min()),
-        "width": int(xs.max() - xs.min()),
-        "height": int(ys.max() - ys.min()),
-        "pixel_count": len(xs),
-        "avg_intensity": float(np.mean(diff_gray[changed_mask])),
-        "significance": min(1.0, float(np.mean(diff_gray[changed_mask])) / 128.0)
-    }]
-
-
+        return np.empty(0, dtype=REGION_DTYPE)
+
+    avg_intensity = float(np.mean(diff_gray[changed_mask]))
+    return np.array([(
+        xs.min(),
+        ys.min(),
+        xs.max() - xs.min(),
+        ys.max() - ys.min(),
+        len(xs),
+        avg_intensity,
+        min(1.0, avg_intensity / 128.0),
+    )], dtype=REGION_DTYPE)
+
+
+def _gaussian_window(size: int, sigma: float, device: torch.device) -> torch.Tensor:
+    coords = torch.arange(size, dtype=torch.float32, device=device) - (size - 1) / 2
+    window = torch.exp(-coords ** 2 / (2 * sigma ** 2))
+    return window / window.sum()
+
+
+def _luma_tensor(image: np.ndarray, device: torch.device) -> torch.Tensor:
+    """Upload an (H, W, 3) or (H, W) image as a float (1, 1, H, W) luma tensor."""
+    t = torch.from_numpy(np.ascontiguousarray(image)).to(device).float()
+    if t.dim() == 3:
+        t = t @ torch.from_numpy(_LUMA).to(device)
+    return t[None, None]
+
+
+def _ssim(x: torch.Tensor, y: torch.Tensor, data_range: float = 255.0,
+          window_size: int = 11, sigma: float = 1.5) -> float:
+    """Mean SSIM of two (1, 1, H, W) tensors with a separable Gaussian window."""
+    # Shrink the window for tiny images, keeping it odd
+    window_size = min(window_size, *x.shape[-2:])
+    window_size -= 1 - window_size % 2
+    window = _gaussian_window(window_size, sigma, x.device)
+
+    # Blur the five moment images as one batch: two 1-D passes each
+    moments = torch.cat([x, y, x * x, y * y, x * y])
+    moments = F.conv2d(moments, window.view(1, 1, 1, -1))
+    moments = F.conv2d(moments, window.view(1, 1, -1, 1))
+    mu_x, mu_y, xx, yy, xy = moments
+
+    c1 = (0.01 * data_range) ** 2
+    c2 = (0.03 * data_range) ** 2
+    var_x = xx - mu_x * mu_x
+    var_y = yy - mu_y * mu_y
+    cov = xy - mu_x * mu_y
+
+    ssim_map = ((2 * mu_x * mu_y + c1) * (2 * cov + c2)) / (
+        (mu_x * mu_x + mu_y * mu_y + c1) * (var_x + var_y + c2)
+    )
+    return ssim_map.mean().item()
+
+
+@torch.inference_mode()
 def compute_structural_similarity(
     baseline: np.ndarray,
-    actual: np.ndarray
+    actual: np.ndarray,
+    device: Union[str, torch.device, None] = None
 ) -> float:
     """
     Compute structural similarity index (SSIM) between images.
 
+    Gaussian-window SSIM (11x11, sigma 1.5) on BT.601 luma, run with torch
+    on the device (CUDA when available). Like the reference implementation
+    (Wang et al.), images are first average-pooled by
+    max(1, round(min(H, W) / 256)) so the window matches viewing scale.
+
     Returns value between 0 and 1, where 1 means identical.
     """
-    try:
-        from skimage.metrics import structural_similarity as ssim
-        # Convert to grayscale
-        baseline_gray = np.mean(baseline, axis=2) if baseline.ndim == 3 else baseline
-        actual_gray = np.mean(actual, axis=2) if actual.ndim == 3 else actual
-
-        # Ensure same size
-        if baseline_gray.shape != actual_gray.shape:
-            actual_gray = np.array(Image.fromarray(actual_gray.astype(np.uint8)).resize(
-                (baseline_gray.shape[1], baseline_gray.shape[0])
-            ))
-
-        return ssim(baseline_gray, actual_gray, data_range=255)
-    except ImportError:
-        # Fallback to simple correlation
-        baseline_flat = baseline.flatten().astype(float)
-        actual_flat = actual.flatten().astype(float)
+    if device is None:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    device = torch.device(device)
 
-        if baseline_flat.shape != actual_flat.shape:
-            return 0.0
+    baseline_gray = _luma_tensor(baseline, device)
+    actual_gray = _luma_tensor(actual, device)
 
-        correlation = np.corrcoef(baseline_flat, actual_flat)[0, 1]
-        return max(0.0, correlation)
+    # Ensure same size
+    if actual_gray.shape != baseline_gray.shape:
+        actual_gray = F.interpolate(actual_gray, size=baseline_gray.shape[-2:],
+                                    mode="bilinear", align_corners=False, antialias=True)
+
+    # Downsample large images before filtering
+    factor = max(1, round(min(baseline_gray.shape[-2:]) / 256))
+    if factor > 1:
+        baseline_gray = F.avg_pool2d(baseline_gray, factor)
+        actual_gray = F.avg_pool2d(actual_gray, factor)
+
+    return _ssim(baseline_gray, actual_gray, data_range=255.0)
+
+
+# Blue-to-red heatmap colors (RGB) for each difference level
+_HEATMAP_LUT = np.stack([
+    np.arange(256),
+    np.zeros(256, dtype=np.int64),
+    255 - np.arange(256),
+], axis=1).astype(np.uint8)
 
 
 def generate_diff_heatmap(
@@ -235,20 +703,15 @@ def generate_diff_heatmap(
     """Generate a heatmap showing differences between images."""
     # Ensure same size
     if baseline.shape != actual.shape:
-        actual = np.array(Image.fromarray(actual).resize(
-            (baseline.shape[1], baseline.shape[0])
-        ))
+        actual = _resize_to(actual, baseline.shape)
 
     # Compute difference
-    diff = np.abs(baseline.astype(float) - actual.astype(float))
-    diff_gray = np.mean(diff, axis=2)
-
-    # Normalize to 0-255
-    diff_normalized = (diff_gray / diff_gray.max() * 255).astype(np.uint8) if diff_gray.max() > 0 else diff_gray.astype(np.uint8)
-
-    # Create colored heatmap (blue to red)
-    heatmap = np.zeros((*diff_normalized.shape, 3), dtype=np.uint8)
-    heatmap[:, :, 0] = diff_normalized  # Red channel
-    heatmap[:, :, 2] = 255 - diff_normalized  # Blue channel
-
-    return heatmap
+    diff_gray = _diff_gray(baseline, actual)
+    if diff_gray.dtype != np.uint8:
+        diff_gray = np.rint(diff_gray).astype(np.uint8)
+
+    # Fold the 0-255 normalization into the color table, then color the
+    # whole frame with a single lookup
+    max_diff = max(int(diff_gray.max()), 1)
+    levels = np.minimum(np.arange(256) * 255 // max_diff, 255)
+    return _HEATMAP_LUT[levels][diff_gray]